@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import sys
@@ -8,64 +9,101 @@ import sys
 # FUNCTION: Extract Pivot Sections From "analysis sheet"
 # =========================================================
 def extract_sections(df):
+    """
+    Splits the raw "analysis sheet" (read with header=None) into
+    {section title: DataFrame}. A title is a row whose only value
+    is in the first column; the next non-blank row is the header.
+    Rows are located with column-wise masks and each section is
+    sliced in one go, with numeric columns returned as numbers.
+    """
     sections = {}
-    current_section = None
-    current_data = []
-
-    for _, row in df.iterrows():
-        first_cell = row[0]
-
-        # Detect section title (single populated cell row)
-        if pd.notna(first_cell) and row.count() == 1:
-            if current_section and current_data:
-                section_df = pd.DataFrame(current_data)
-                section_df.columns = section_df.iloc[0]
-                section_df = section_df[1:]
-                sections[current_section.strip()] = section_df.reset_index(drop=True)
-
-            current_section = first_cell.strip()
-            current_data = []
-
-        elif current_section:
-            if row.isna().all():
-                continue
-            current_data.append(row.tolist())
-
-    # Save last section
-    if current_section and current_data:
-        section_df = pd.DataFrame(current_data)
-        section_df.columns = section_df.iloc[0]
-        section_df = section_df[1:]
-        sections[current_section.strip()] = section_df.reset_index(drop=True)
+
+    filled = df.notna().sum(axis=1).to_numpy()
+    first_cell = df.iloc[:, 0]
+    is_title = (first_cell.notna().to_numpy()) & (filled == 1)
+
+    title_rows = is_title.nonzero()[0]
+    bounds = list(title_rows[1:]) + [len(df)]
+
+    for title_row, end in zip(title_rows, bounds):
+        block = df.iloc[title_row + 1:end]
+        block = block[filled[title_row + 1:end] > 0]
+        if block.empty:
+            continue
+
+        header = block.iloc[0]
+        section_df = block.iloc[1:].copy()
+        section_df.columns = header.tolist()
+
+        # Drop the unused trailing columns of the sheet
+        section_df = section_df.loc[:, header.notna().to_numpy()]
+
+        sections[str(first_cell.iloc[title_row]).strip()] = (
+            section_df.reset_index(drop=True).infer_objects()
+        )
 
     return sections
 
 
+# =========================================================
+# FUNCTION: Downsample Long Daily Series For Plotting
+# =========================================================
+# Above DAILY_POINT_BUDGET days the trend is bucketed and only the
+# rows holding each bucket's min and max are plotted, so spikes and
+# dips stay visible. Line charts with more than WEBGL_MIN_POINTS
+# points are drawn with WebGL.
+DAILY_POINT_BUDGET = 2000
+WEBGL_MIN_POINTS = 1000
+
+
+def downsample_minmax(df, y_columns, budget=DAILY_POINT_BUDGET):
+    """
+    Keeps at most about budget rows of df (in order): the first
+    and last row plus, per bucket, the rows with the min and max
+    of every y column.
+    """
+    if len(df) <= budget:
+        return df
+
+    n_buckets = max(budget // (2 * len(y_columns)), 1)
+    bucket = np.arange(len(df)) * n_buckets // len(df)
+
+    keep = [np.array([0, len(df) - 1])]
+    for col in y_columns:
+        grouped = pd.Series(df[col].fillna(0).to_numpy()).groupby(bucket)
+        keep.append(grouped.idxmin().to_numpy())
+        keep.append(grouped.idxmax().to_numpy())
+
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
 # =========================================================
 # MAIN DASHBOARD FUNCTION
 # =========================================================
 
-def run_dashboard(file_path: str,):
+def run_dashboard(source):
     """
-    Launches the Streamlit dashboard using the
-    'analysis sheet' from the provided Excel file.
+    Launches the Streamlit dashboard from either a report
+    ({section title: DataFrame}, see analysis.build_report)
+    or the 'analysis sheet' of the provided Excel file.
     """
 
-    st.set_page_config(page_title=f"Bank Statement Dashboard", layout="wide")
-    st.title(f"Bank Statement Dashboard")
+    st.set_page_config(page_title="Bank Statement Dashboard", layout="wide")
+    st.title("Bank Statement Dashboard")
 
-    # Load analysis sheet
-    raw_df = pd.read_excel(file_path, sheet_name="Analysis", header=None)
-    sections = extract_sections(raw_df)
+    if isinstance(source, dict):
+        # Sections already built in memory
+        sections = {title: section.copy() for title, section in source.items()}
+    else:
+        # Load analysis sheet
+        raw_df = pd.read_excel(source, sheet_name="Analysis", header=None)
+        sections = extract_sections(raw_df)
 
     # -----------------------------------------------------
     # OVERALL FINANCIAL SUMMARY
     # -----------------------------------------------------
     if "OVERALL FINANCIAL SUMMARY" in sections:
         summary_df = sections["OVERALL FINANCIAL SUMMARY"]
-        summary_df["Value (₦)"] = pd.to_numeric(
-            summary_df["Value (₦)"], errors="coerce"
-        )
 
         total_debit = summary_df.loc[
             summary_df["Metric"] == "Total Debit Amount", "Value (₦)"
@@ -100,12 +138,6 @@ def run_dashboard(file_path: str,):
     # -----------------------------------------------------
     if "MONTHLY CASH FLOW SUMMARY" in sections:
         monthly_df = sections["MONTHLY CASH FLOW SUMMARY"]
-        monthly_df["Credit(₦)"] = pd.to_numeric(
-            monthly_df["Credit(₦)"], errors="coerce"
-        )
-        monthly_df["Debit(₦)"] = pd.to_numeric(
-            monthly_df["Debit(₦)"], errors="coerce"
-        )
 
         fig = px.bar(
             monthly_df,
@@ -123,13 +155,6 @@ def run_dashboard(file_path: str,):
     if "PLATFORM PERFORMANCE SUMMARY" in sections:
         platform_df = sections["PLATFORM PERFORMANCE SUMMARY"]
 
-        platform_df["Credit(₦)"] = pd.to_numeric(
-            platform_df["Credit(₦)"], errors="coerce"
-        )
-        platform_df["Debit(₦)"] = pd.to_numeric(
-            platform_df["Debit(₦)"], errors="coerce"
-        )
-
         col1, col2 = st.columns(2)
 
         fig_credit = px.bar(
@@ -151,12 +176,39 @@ def run_dashboard(file_path: str,):
         col1.plotly_chart(fig_credit, use_container_width=True)
         col2.plotly_chart(fig_debit, use_container_width=True)
 
+    # -----------------------------------------------------
+    # CATEGORY SPENDING SUMMARY
+    # -----------------------------------------------------
+    if "CATEGORY SPENDING SUMMARY" in sections:
+        category_df = sections["CATEGORY SPENDING SUMMARY"]
+
+        st.markdown("---")
+        st.subheader("Spending by Category")
+
+        col1, col2 = st.columns(2)
+
+        fig_spending = px.pie(
+            category_df[category_df["Debit(₦)"] > 0],
+            names="Category",
+            values="Debit(₦)",
+            title="Debit by Category"
+        )
+
+        fig_income = px.pie(
+            category_df[category_df["Credit(₦)"] > 0],
+            names="Category",
+            values="Credit(₦)",
+            title="Credit by Category"
+        )
+
+        col1.plotly_chart(fig_spending, use_container_width=True)
+        col2.plotly_chart(fig_income, use_container_width=True)
+
     # -----------------------------------------------------
     # TOP 10 SPENDING RECIPIENTS
     # -----------------------------------------------------
     if "TOP 10 SPENDING RECIPIENTS" in sections:
         spending_df = sections["TOP 10 SPENDING RECIPIENTS"].copy()
-        spending_df["Amount"] = pd.to_numeric(spending_df["Amount"], errors="coerce")
 
         spending_df = spending_df.sort_values("Amount", ascending=True)
 
@@ -178,7 +230,6 @@ def run_dashboard(file_path: str,):
     # -----------------------------------------------------
     if "TOP 10 INCOME SOURCES" in sections:
         income_df = sections["TOP 10 INCOME SOURCES"].copy()
-        income_df["Amount"] = pd.to_numeric(income_df["Amount"], errors="coerce")
 
         income_df = income_df.sort_values("Amount", ascending=True)
 
@@ -197,23 +248,88 @@ def run_dashboard(file_path: str,):
 
     if "DAILY TRANSACTION TREND" in sections:
         Daily_df = sections["DAILY TRANSACTION TREND"]
-        Daily_df["Credit(₦)"] = pd.to_numeric(
-            Daily_df["Credit(₦)"], errors="coerce"
-        )
-        Daily_df["Debit(₦)"] = pd.to_numeric(
-            Daily_df["Debit(₦)"], errors="coerce"
-        )
+        Daily_df["Date_Only"] = pd.to_datetime(Daily_df["Date_Only"])
+
+        # Zooming = picking a window; it is re-sliced at full resolution
+        first_day = Daily_df["Date_Only"].min().date()
+        last_day = Daily_df["Date_Only"].max().date()
+        if first_day < last_day:
+            start, end = st.slider(
+                "Daily trend window",
+                min_value=first_day,
+                max_value=last_day,
+                value=(first_day, last_day)
+            )
+            Daily_df = Daily_df[Daily_df["Date_Only"].between(pd.Timestamp(start), pd.Timestamp(end))]
+
+        plot_df = downsample_minmax(Daily_df, ["Credit(₦)", "Debit(₦)"])
+
+        title = "Daily Trend"
+        if len(plot_df) < len(Daily_df):
+            title += f" ({len(plot_df)} of {len(Daily_df)} days shown, narrow the window for full detail)"
 
         fig = px.line(
-            Daily_df,
+            plot_df,
             x="Date_Only",
             y=["Credit(₦)", "Debit(₦)"],
-            title="Daily Trend"
-            
+            title=title,
+            render_mode="webgl" if len(plot_df) > WEBGL_MIN_POINTS else "auto"
         )
 
         st.plotly_chart(fig, use_container_width=True)
 
+# =========================================================
+# SAVINGS DASHBOARD
+# =========================================================
+def run_savings_dashboard(savings_report):
+    """
+    Savings tab from analysis.build_savings_report: total interest
+    and latest balance, then interest and balance per savings type.
+    """
+    sections = {
+        title: rows.dropna(axis=1, how="all")
+        for title, rows in savings_report.dropna(subset=["Section"]).groupby("Section", sort=False)
+    }
+
+    st.title("Savings Dashboard")
+
+    col1, col2 = st.columns(2)
+    if "TOTAL INTEREST" in sections:
+        col1.metric("Total Interest Earned", f"₦{sections['TOTAL INTEREST']['Value'].iloc[0]:,.2f}")
+    if "LATEST SAVINGS BALANCE" in sections:
+        col2.metric("Latest Savings Balance", f"₦{sections['LATEST SAVINGS BALANCE']['Value'].iloc[0]:,.2f}")
+
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+    if "INTEREST BY SAVINGS TYPE" in sections:
+        fig_interest = px.bar(
+            sections["INTEREST BY SAVINGS TYPE"],
+            x="Credit(₦)",
+            y="Description",
+            orientation="h",
+            title="Interest by Savings Type"
+        )
+        col1.plotly_chart(fig_interest, use_container_width=True)
+
+    if "BALANCE BY SAVINGS TYPE" in sections:
+        fig_balance = px.bar(
+            sections["BALANCE BY SAVINGS TYPE"],
+            x="Balance After(₦)",
+            y="Description",
+            orientation="h",
+            title="Balance by Savings Type"
+        )
+        col2.plotly_chart(fig_balance, use_container_width=True)
+
+
 output_path = sys.argv[1] if len(sys.argv) > 1 else "default_path"
 if __name__ == "__main__":
-    run_dashboard(output_path)
\ No newline at end of file
+    if output_path.lower().endswith((".parquet", ".feather")):
+        # Cleaned table saved by storage.save_cleaned
+        from analysis import ANALYSIS_COLUMNS, build_report
+        from storage import load_cleaned
+
+        run_dashboard(build_report(load_cleaned(output_path, columns=ANALYSIS_COLUMNS)))
+    else:
+        run_dashboard(output_path)
\ No newline at end of file
@@ -0,0 +1,593 @@
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from cleaning import expand_transactions, naira
+from diagnostics import span
+
+
+# =========================================================
+# REPORT SECTIONS (titles as written to the "Analysis" sheet)
+# =========================================================
+SUMMARY_SECTION = "OVERALL FINANCIAL SUMMARY"
+MONTHLY_SECTION = "MONTHLY CASH FLOW SUMMARY"
+PLATFORM_SECTION = "PLATFORM PERFORMANCE SUMMARY"
+DAILY_SECTION = "DAILY TRANSACTION TREND"
+SPENDING_SECTION = "TOP 10 SPENDING RECIPIENTS"
+INCOME_SECTION = "TOP 10 INCOME SOURCES"
+
+SECTION_ORDER = [
+    SUMMARY_SECTION,
+    MONTHLY_SECTION,
+    PLATFORM_SECTION,
+    DAILY_SECTION,
+    SPENDING_SECTION,
+    INCOME_SECTION,
+]
+
+# Only in reports of categorised transactions (see category_section);
+# written after the SECTION_ORDER sections
+CATEGORY_SECTION = "CATEGORY SPENDING SUMMARY"
+
+SAVINGS_SHEET = 'Savings Account Transactions'
+
+# Values of 'Transaction Type' (in pivot column order)
+TRANSACTION_TYPES = ['Credit(₦)', 'Debit(₦)']
+
+# Cleaned columns read by the analysis (build_cube, latest_balance)
+ANALYSIS_COLUMNS = ['Trans. Date', 'Time', 'Transaction Type', 'Transaction To/From', 'Platform', 'Amount',
+                    'Balance After(₦)']
+
+
+# =========================================================
+# PERCENTAGE HELPERS
+# =========================================================
+def add_percentage_columns(pivot_df,
+                           debit_col='Debit(₦)',
+                           credit_col='Credit(₦)'):
+    """
+    Adds percentage contribution columns to a pivot table.
+    Handles cases where totals are zero.
+    """
+
+    df = pivot_df.copy()
+
+    # Ensure missing columns are handled safely
+    if debit_col not in df.columns:
+        df[debit_col] = 0
+
+    if credit_col not in df.columns:
+        df[credit_col] = 0
+
+    # Calculate totals
+    total_debit = df[debit_col].sum()
+    total_credit = df[credit_col].sum()
+    total_flow = total_debit + total_credit
+
+    # Protect against division by zero
+    if total_debit == 0:
+        df['% Debit'] = 0
+    else:
+        df['% Debit'] = (df[debit_col] / total_debit * 100).round(2)
+
+    if total_credit == 0:
+        df['% Credit'] = 0
+    else:
+        df['% Credit'] = (df[credit_col] / total_credit * 100).round(2)
+
+    if total_flow == 0:
+        df['% Total Flow'] = 0
+    else:
+        df['% Total Flow'] = (
+            (df[debit_col] + df[credit_col]) / total_flow * 100
+        ).round(2)
+
+    return df
+
+
+def summary_section(total_debit, total_credit, debit_count, credit_count, latest_balance):
+    return pd.DataFrame({
+        "Metric": [
+            "Total Debit Amount",
+            "Total Credit Amount",
+            "Number of Debit Transactions",
+            "Number of Credit Transactions",
+            "Current Balance"
+        ],
+        "Value (₦)": [
+            total_debit,
+            total_credit,
+            int(debit_count),
+            int(credit_count),
+            latest_balance
+        ]
+    })
+
+
+def monthly_section(month_pivot):
+    """
+    Pivot indexed by year-month periods, in calendar order and
+    labelled like 'January 2024', with percentage columns.
+    """
+    monthly_summary = add_percentage_columns(month_pivot.sort_index())
+    monthly_summary.index = monthly_summary.index.strftime('%B %Y')
+    return monthly_summary.rename_axis('Month')
+
+
+def finish_sections(report):
+    """
+    Pivot indexes become ordinary columns, as in the sheet.
+    """
+    for title, section in report.items():
+        section.columns.name = None
+        if section.index.name is not None:
+            report[title] = section.reset_index()
+    return report
+
+
+def convert_distinct(values, convert):
+    """
+    convert applied to the distinct values only (a statement
+    repeats its dates and times), spread back over the rows.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    converted = convert(pd.Series(uniques, dtype=values.dtype))
+    return pd.Series(converted.to_numpy().take(codes), index=values.index, name=values.name)
+
+
+def transaction_timestamps(df):
+    """
+    Trans. Date combined with Time (when the frame has it).
+    """
+    timestamps = convert_distinct(df['Trans. Date'], pd.to_datetime)
+    if 'Time' in df.columns:
+        times = convert_distinct(
+            df['Time'], lambda times: pd.to_timedelta(times.astype(str), errors='coerce').fillna(pd.Timedelta(0)))
+        timestamps = timestamps + times
+    return timestamps
+
+
+def _newest_first(values):
+    """
+    True when datetimes in statement order mostly go backwards
+    (the statement lists its newest transaction first).
+    """
+    steps = np.diff(np.asarray(values, dtype='datetime64[ns]').view(np.int64))
+    return bool((steps < 0).sum() > (steps > 0).sum())
+
+
+def chronological_order(timestamps, newest_first=None):
+    """
+    Positions of timestamps (in statement order) from oldest to
+    newest. Transactions in the same second keep the statement's
+    order, read oldest-first (backwards when newest_first, which
+    is detected when not given). Input that is already in order
+    either way is not sorted again.
+    """
+    values = np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+    if newest_first is None:
+        newest_first = _newest_first(values.view('datetime64[ns]'))
+
+    positions = np.arange(len(values))
+    if newest_first:
+        positions, values = positions[::-1], values[::-1]
+    if (np.diff(values) < 0).any():
+        positions = positions[np.argsort(values, kind='stable')]
+    return positions
+
+
+def latest_balance(df):
+    """
+    'Balance After(₦)' of the last transaction by date and time.
+    """
+    if df.empty:
+        return 0
+
+    # Only the rows of the last day need their times compared
+    dates = pd.to_datetime(df['Trans. Date'])
+    last_day = df[(dates == dates.max()).to_numpy()]
+    last = chronological_order(transaction_timestamps(last_day), _newest_first(dates))[-1]
+    return naira(last_day, 'Balance After(₦)').iloc[last]
+
+
+# =========================================================
+# AGGREGATION CUBE
+# =========================================================
+# One groupby over the cleaned rows gives the Amount sum and row
+# Count for every date x type x platform x counterparty. Every
+# section is a roll-up of this (much smaller) cube.
+CUBE_KEYS = ['Date_Only', 'Transaction Type', 'Platform', 'Transaction To/From']
+
+
+def build_cube(df):
+    """
+    Sum and count of Amount per CUBE_KEYS combination. Missing
+    platforms/counterparties are kept so totals stay complete.
+    """
+    amount = naira(df, 'Amount')
+    keys = [
+        pd.to_datetime(df['Trans. Date']).dt.normalize().rename('Date_Only'),
+        df['Transaction Type'],
+        df['Platform'],
+        df['Transaction To/From'],
+    ]
+    cube = amount.groupby(keys, dropna=False, sort=False).agg(Amount='sum', Count='size')
+
+    # Categorical keys (compact frames) become plain labels
+    return cube.set_axis(cube.index.set_levels([
+        level.astype(level.categories.dtype) if isinstance(level, pd.CategoricalIndex) else level
+        for level in cube.index.levels
+    ]))
+
+
+def merge_cubes(*cubes):
+    """
+    Adds cubes together (e.g. an existing history and new rows).
+    """
+    return pd.concat(cubes).groupby(level=CUBE_KEYS, dropna=False, sort=False).sum()
+
+
+def _type_rollup(amounts, level):
+    sums = amounts.groupby(level=[level, 'Transaction Type']).sum().unstack(fill_value=0)
+    return sums.reindex(columns=TRANSACTION_TYPES, fill_value=0)
+
+
+def sections_from_cube(cube, balance):
+    """
+    Builds the "Analysis" sections that do not depend on Top N
+    from a cube and the current balance. Returns {section title:
+    DataFrame} in the same layout the dashboard reads from the sheet.
+    """
+    totals = cube.groupby(level='Transaction Type').sum().reindex(TRANSACTION_TYPES, fill_value=0)
+    daily = _type_rollup(cube['Amount'], 'Date_Only').sort_index()
+
+    # ========================================
+    # 1️⃣ OVERALL FINANCIAL SUMMARY
+    # ========================================
+    summary_df = summary_section(
+        totals.loc['Debit(₦)', 'Amount'],
+        totals.loc['Credit(₦)', 'Amount'],
+        totals.loc['Debit(₦)', 'Count'],
+        totals.loc['Credit(₦)', 'Count'],
+        balance
+    )
+
+    # ========================================
+    # 2️⃣ MONTHLY CASH FLOW SUMMARY (per year-month)
+    # ========================================
+    monthly_summary = monthly_section(daily.groupby(daily.index.to_period('M')).sum())
+
+    # ========================================
+    # 3️⃣ PLATFORM PERFORMANCE SUMMARY
+    # ========================================
+    platform_summary = add_percentage_columns(_type_rollup(cube['Amount'], 'Platform'))
+
+    # ========================================
+    # 4️⃣ DAILY TRANSACTION TREND (Better Format)
+    # ========================================
+    daily_summary = daily.set_axis(pd.Index(daily.index.date, name='Date_Only'))
+
+    return finish_sections({
+        SUMMARY_SECTION: summary_df,
+        MONTHLY_SECTION: monthly_summary,
+        PLATFORM_SECTION: platform_summary,
+        DAILY_SECTION: daily_summary,
+    })
+
+
+def build_sections(df):
+    """
+    The Top-N-independent "Analysis" sections of a cleaned dataset.
+    """
+    return sections_from_cube(build_cube(df), latest_balance(df))
+
+
+# =========================================================
+# COUNTERPARTY RANKINGS (TOP / BOTTOM N)
+# =========================================================
+def ranking_table(totals):
+    """
+    Counterparty totals (Series indexed by 'Transaction To/From')
+    as a ranking: sorted largest first, with '% of Total'.
+    """
+    ranking = (
+        totals
+        .sort_values(ascending=False)
+        .rename('Amount')
+        .rename_axis('Transaction To/From')
+        .reset_index()
+    )
+
+    total_amount = ranking['Amount'].sum()
+    if total_amount == 0:
+        ranking['% of Total'] = 0
+    else:
+        ranking['% of Total'] = (ranking['Amount'] / total_amount * 100).round(2)
+
+    return ranking
+
+
+def rankings_from_cube(cube):
+    """
+    Totals per 'Transaction To/From' for each transaction type,
+    sorted largest first, with '% of Total' of the grand total.
+    Computed once per statement; Top N is then just a slice.
+    """
+    by_party = _type_rollup(cube['Amount'], 'Transaction To/From')
+    counts = _type_rollup(cube['Count'], 'Transaction To/From')
+
+    # Only counterparties that have transactions of that type
+    return {
+        transaction_type: ranking_table(by_party.loc[counts[transaction_type] > 0, transaction_type])
+        for transaction_type in TRANSACTION_TYPES
+    }
+
+
+def rank_counterparties(df):
+    return rankings_from_cube(build_cube(df))
+
+
+def top_counterparties(ranking, n, bottom=False):
+    """
+    First n rows of a ranking, or the n smallest (smallest
+    first) when bottom is True.
+    """
+    n = max(int(n), 0)
+    if bottom:
+        return ranking.iloc[max(len(ranking) - n, 0):].iloc[::-1].reset_index(drop=True)
+    return ranking.iloc[:n].reset_index(drop=True)
+
+
+def select_top_n(sections, rankings, top_n):
+    """
+    Adds the Top N spending/income sections to the other sections.
+    """
+    report = dict(sections)
+    report[SPENDING_SECTION] = top_counterparties(rankings['Debit(₦)'], top_n)
+    report[INCOME_SECTION] = top_counterparties(rankings['Credit(₦)'], top_n)
+    return report
+
+
+def analyse(df):
+    """
+    (sections, rankings) of a cleaned dataset from a single cube.
+    """
+    with span('pivots', rows=len(df)):
+        cube = build_cube(df)
+        return sections_from_cube(cube, latest_balance(df)), rankings_from_cube(cube)
+
+
+def build_report(df, top_n=10):
+    """
+    Builds every "Analysis" section from the cleaned dataset.
+    """
+    sections, rankings = analyse(df)
+    return select_top_n(sections, rankings, top_n)
+
+
+# =========================================================
+# CATEGORY SPENDING (categories from categories.categorise)
+# =========================================================
+def category_section(df, categories, start=None, end=None, types=TRANSACTION_TYPES, days=None):
+    """
+    Credit/Debit totals and percentages per category, largest
+    spending first. start/end (dates, inclusive) and types
+    restrict it like the dashboard filters; days is the date of
+    every row when already known (a filter index's 'row_days'),
+    so the dates are not parsed again.
+    """
+    keep = df['Transaction Type'].isin(types).to_numpy()
+    if start is not None:
+        if days is None:
+            days = pd.to_datetime(df['Trans. Date']).to_numpy().astype('datetime64[D]')
+        bounds = np.array([start, end], dtype='datetime64[D]')
+        keep = keep & (days >= bounds[0]) & (days <= bounds[1])
+
+    amounts = naira(df, 'Amount')[keep]
+    sums = amounts.groupby([categories[keep], df['Transaction Type'][keep]], observed=True).sum().unstack(fill_value=0)
+    sums = sums.reindex(columns=TRANSACTION_TYPES, fill_value=0)
+    sums.index = sums.index.astype(str)
+
+    section = add_percentage_columns(sums.rename_axis('Category')).sort_values('Debit(₦)', ascending=False)
+    return finish_sections({CATEGORY_SECTION: section})[CATEGORY_SECTION]
+
+
+# =========================================================
+# SAVINGS SHEET ANALYSIS
+# =========================================================
+def build_savings_report(savings_df):
+    """
+    Summarises the 'Savings Account Transactions' sheet
+    (interest earned, latest balance, per-type breakdowns).
+    Returns None when the sheet has no usable rows.
+    """
+    with span('savings analysis', rows=len(savings_df)):
+        return _savings_sections(savings_df)
+
+
+def _savings_sections(savings_df):
+    savings_df = savings_df.drop(columns="Value Date")
+
+    # Check if sheet is completely empty
+    if savings_df.empty:
+        return None
+
+    # Strip column names (very important)
+    savings_df.columns = savings_df.columns.str.strip()
+
+    # Expected columns
+    required_columns = [
+        'Trans. Date',
+        'Description',
+        'Debit(₦)',
+        'Credit(₦)',
+        'Balance After(₦)',
+        'Channel',
+        'Transaction Reference'
+    ]
+
+    # Validate required columns exist
+    missing_cols = [col for col in required_columns if col not in savings_df.columns]
+    if missing_cols:
+        return None
+
+    # Work on a COPY to avoid SettingWithCopyWarning
+    df_savings = savings_df.copy()
+
+    # ----------------------------
+    # CLEAN DATE COLUMN
+    # ----------------------------
+    df_savings['Trans. Date'] = pd.to_datetime(
+        df_savings['Trans. Date'],
+        errors='coerce'
+    )
+
+    # ----------------------------
+    # CLEAN NUMERIC COLUMNS
+    # ----------------------------
+    numeric_cols = ['Debit(₦)', 'Credit(₦)', 'Balance After(₦)']
+
+    # All three columns in one pass ('--' placeholders count as 0)
+    numbers = df_savings[numeric_cols].astype(str).replace({',': ''}, regex=True).replace('--', '0')
+    df_savings[numeric_cols] = numbers.apply(pd.to_numeric, errors='coerce').fillna(0)
+
+    # Remove rows where Date is NaT
+    df_savings = df_savings[df_savings['Trans. Date'].notna()]
+
+    if df_savings.empty:
+        return None
+
+    # =========================
+    # TOTAL INTEREST
+    # =========================
+    interest_df = df_savings[
+        df_savings['Description'].str.contains(
+            'Interest',
+            case=False,
+            na=False
+        )
+    ]
+
+    summary_df = pd.DataFrame({
+        'Metric': ['Total Interest Earned'],
+        'Value': [interest_df['Credit(₦)'].sum()]
+    })
+
+    # =========================
+    # SAVINGS BALANCE (Latest)
+    # =========================
+    latest_balance = df_savings.sort_values(
+        by='Trans. Date'
+    ).iloc[-1]['Balance After(₦)']
+
+    balance_df = pd.DataFrame({
+        'Metric': ['Latest Savings Balance'],
+        'Value': [latest_balance]
+    })
+
+    # =========================
+    # INTEREST BY SAVINGS TYPE
+    # =========================
+    interest_by_type = (
+        interest_df
+        .groupby('Description')['Credit(₦)']
+        .sum()
+        .reset_index()
+    )
+
+    # =========================
+    # BALANCE BY SAVINGS TYPE
+    # =========================
+    balance_by_type = (
+        df_savings
+        .groupby('Description')['Balance After(₦)']
+        .max()
+        .reset_index()
+    )
+
+    # Round currency properly
+    summary_df["Value"] = summary_df["Value"].round(2)
+    balance_df["Value"] = balance_df["Value"].round(2)
+
+    # Add section titles
+    summary_df.insert(0, "Section", "TOTAL INTEREST")
+    balance_df.insert(0, "Section", "LATEST SAVINGS BALANCE")
+    interest_by_type.insert(0, "Section", "INTEREST BY SAVINGS TYPE")
+    balance_by_type.insert(0, "Section", "BALANCE BY SAVINGS TYPE")
+
+    # Combine everything vertically
+    return pd.concat(
+        [
+            summary_df,
+            pd.DataFrame([[]]),  # blank row
+            balance_df,
+            pd.DataFrame([[]]),
+            interest_by_type,
+            pd.DataFrame([[]]),
+            balance_by_type
+        ],
+        ignore_index=True
+    )
+
+
+# =========================================================
+# EXCEL EXPORT (only when a report is requested)
+# =========================================================
+# The workbook is streamed with openpyxl's write-only mode: rows go
+# to the file as they are appended instead of being kept as cell
+# objects, and the cleaned data is converted EXPORT_CHUNK_ROWS rows
+# at a time, so memory stays flat however long the statement is.
+# The layout matches what pandas' to_excel wrote before (bold
+# headers, empty cells for missing values, no index).
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def _append_header(sheet, labels):
+    cells = []
+    for label in labels:
+        cell = WriteOnlyCell(sheet, value=str(label))
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    sheet.append(cells)
+
+
+def _append_frame(sheet, frame):
+    """
+    Appends frame's header and rows to a write-only sheet.
+    """
+    _append_header(sheet, frame.columns)
+    for start in range(0, len(frame), EXPORT_CHUNK_ROWS):
+        chunk = frame.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+
+def write_report(target, cleaned_df, report, savings_report=None):
+    """
+    Writes the cleaned data, the "Analysis" sections and the
+    optional savings analysis into one workbook. target is a
+    path or a writable binary buffer.
+    """
+    with span('excel write', rows=len(cleaned_df)):
+        workbook = Workbook(write_only=True)
+
+        # Write cleaned data (always in the full cleaned layout)
+        _append_frame(workbook.create_sheet("Cleaned_Data"), expand_transactions(cleaned_df))
+
+        # Each section: its title, its table, then two blank rows
+        analysis_sheet = workbook.create_sheet("Analysis")
+        for title in [*SECTION_ORDER, CATEGORY_SECTION]:
+            if title not in report:
+                continue
+            _append_header(analysis_sheet, [title])
+            _append_frame(analysis_sheet, report[title])
+            analysis_sheet.append([])
+            analysis_sheet.append([])
+
+        if savings_report is not None:
+            _append_frame(workbook.create_sheet("Savings_Analysis"), savings_report)
+
+        workbook.save(target)
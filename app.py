@@ -1,512 +1,308 @@
+import time
+from functools import partial
+
 import streamlit as st
-import pandas as pd
+
+from analysis import CATEGORY_SECTION, DAILY_SECTION, TRANSACTION_TYPES, category_section, select_top_n
+from cleaning import memory_report
+from dataset_view import column_values, matching_rows
+from diagnostics import record_into, span, spans_json
+from filters import filtered_report
+from jobs import POLL_SECONDS, get_job, job_data, job_progress
+from pipeline import (DIAGNOSTICS_MAX_SPANS, DIAGNOSTICS_MEMORY, SQLITE_PATH, analyse_savings, analyse_statement,
+                      category_rules, clean_statement, clear_caches, dataset_index, export_report,
+                      export_stored_report, filter_index, history_categories, history_dataset_index,
+                      history_filter_index, history_reconciliation, merge_upload, reconcile_statement, session_token,
+                      start_processing, statement_categories, stored_categories, stored_filtered_report,
+                      stored_matching, stored_page, stored_reconciliation, stored_values, track_session, upload_key)
+from reconcile import MAX_LISTED
+from sessions import MEMORY_BUDGET_MB, session_usage
+from sqlstore import SQL_COLUMNS
 
         
         # Create tabs
 uploaded_file = st.file_uploader("Upload Bank Statement")
+
+# Stage spans of the work done in this session (see diagnostics.py)
+diagnostics = st.session_state.setdefault("diagnostics", [])
+record_into(diagnostics, memory=DIAGNOSTICS_MEMORY)
 tab1, tab2 = st.tabs(["Dashboard", "Dataset"])
-if uploaded_file is None:
+
+if st.button("Clear cache"):
+    clear_caches(st.session_state.pop("processed_key", None))
+    st.query_params.pop("job", None)
+    st.query_params.pop("token", None)
+
+# The upload on screen: the uploaded file or, after a browser
+# refresh, the background job named in the page URL (?job=<key>);
+# the URL's token must be one of the job's owners (see jobs.py)
+job = None
+job_key = st.query_params.get("job")
+job_token = st.query_params.get("token")
+if uploaded_file is not None:
+    data = uploaded_file.getvalue()
+    key = upload_key(data)
+elif job_key and job_token and job_data(job_key, job_token) is not None:
+    key = job_key
+    data = job_data(job_key, job_token)
+    st.session_state["job_token"] = job_token
+    st.session_state["processed_key"] = key
+else:
+    data = None
+
+if data is None:
     st.button("Process Data", disabled=True)
 else:
+    # Remember the processed upload so widget reruns keep the dashboard
     if st.button("Process Data"):
-        st.success("FIle Processed and Visualized")
-        tab1, tab2 = st.tabs(["Dashboard", "Dataset"])
-       # tab1, tab2,tab3 = st.tabs(["Dashboard","Savings Dashboard", "Dataset"])
-        xls = pd.ExcelFile(uploaded_file)
-        savings_sheet_name = 'Savings Account Transactions'
-
-        if savings_sheet_name in xls.sheet_names:
-            savings_df = pd.read_excel(uploaded_file, sheet_name=savings_sheet_name)
-            savings_sheet_exists = True
-        else:
-            savings_sheet_exists = False
+        st.session_state["processed_key"] = key
+        st.query_params["job"] = key
+        st.query_params["token"] = session_token()
+        diagnostics.clear()
+        start_processing(key, data)
+
+    # Merge overlapping statements of one account (see history.py)
+    merge_history = st.checkbox("Merge into account history")
+    account = st.text_input("Account", value="default") if merge_history else None
+
+    # Processing runs in the background (see jobs.py); reruns poll it
+    if st.session_state.get("processed_key") == key:
+        job = get_job(key, session_token()) or start_processing(key, data)
+        if job['status'] == 'failed':
+            st.error(f"Processing failed: {job['error']}")
+        elif job['status'] != 'done':
+            fraction, stage = job_progress(job)
+            st.progress(fraction, text=f"Processing... ({stage} done)" if stage else "Processing...")
+
+    if job is not None and job['status'] == 'done':
+        # Stage spans of the job join this session's diagnostics once
+        if st.session_state.get("job_spans_key") != key:
+            st.session_state["job_spans_key"] = key
+            diagnostics.extend(job['spans'])
+
+        # Count this session's memory (may evict idle sessions' results)
+        track_session(key, data)
+
+        status = st.empty()
+        tab1, tab2, tab3 = st.tabs(["Dashboard", "Savings Dashboard", "Dataset"])
         with tab1:
-            if uploaded_file:
-                df = pd.read_excel(uploaded_file,header=6)
-                
-                # st.header("Dashboard")
-                # st.write("Here you can add charts, KPIs, filters…")
-                # st.bar_chart(df.groupby("Month")["Amount"].sum())
-                # Convert 'Trans. Date' to datetime and extract Date/Time
-                df['Trans. Date1'] = pd.to_datetime(df['Trans. Date'], format='%d %b %Y %H:%M:%S')
-                df['Trans. Date'] = df['Trans. Date1'].dt.date
-                df['Time'] = df['Trans. Date1'].dt.time
-        
-                # 7. Extract only the name from Description
-                def extract_name(desc):
-                    desc = str(desc)
-                    # Check if 'from' or 'to' exists
-                    if 'from' in desc.lower():
-                        name = desc.lower().split('from')[1].split('|')[0].strip()
-                    elif 'to' in desc.lower():
-                        name = desc.lower().split('to')[1].split('|')[0].strip()
-                    else:
-                        name = desc.split('|')[0].strip()
-                    # Capitalize first letters
-                    return name.title()
-        
-                df['Transaction Name'] = df['Description'].apply(extract_name)
-        
-                # Handle Debit and Credit
-                df['Debit(₦)'] = df['Debit(₦)'].replace('--', 0).replace(',', '', regex=True).astype(float)
-                df['Credit(₦)'] = df['Credit(₦)'].replace('--', 0).replace(',', '', regex=True).astype(float)
-        
-                # Create transaction type and unified amount
-                df['Transaction Type'] = df.apply(lambda x: 'Debit(₦)' if x['Debit(₦)'] > 0 else 'Credit(₦)', axis=1)
-                df['Amount'] = df.apply(lambda x: x['Debit(₦)'] if x['Debit(₦)'] > 0 else x['Credit(₦)'], axis=1)
-                df = df.drop(columns=['Debit(₦)', 'Credit(₦)'])
-        
-                # Split Description column
-                desc_splits = df['Description'].str.split('|', expand=True)
-                desc_columns = ['Transaction To/From', 'Platform', 'Account/Phone', 'Extra Info']
-                desc_splits.columns = desc_columns[:desc_splits.shape[1]]
-        
-                # Correct swapped Platform and Account/Phone
-                def fix_swap(row):
-                    platform = str(row['Platform']).strip()
-                    account = str(row['Account/Phone']).strip()
-                    
-                    # Check if Platform is mostly digits and Account/Phone is letters (network name)
-                    if platform.replace(' ', '').isdigit() and any(c.isalpha() for c in account):
-                        row['Platform'], row['Account/Phone'] = account, platform
-                    return row
-        
-                desc_splits = desc_splits.apply(fix_swap, axis=1)
-        
-                # Merge back into dataframe
-                df = pd.concat([df, desc_splits], axis=1)
-                df = df.drop(columns= "Value Date")
-        
-                # 8. Reorder columns
-                cols_order = ['Transaction Reference', 'Trans. Date', 'Time', 'Transaction Type','Transaction To/From', 'Transaction Name', 'Account/Phone', 'Platform',   
-                            'Channel', 'Extra Info', 'Amount','Balance After(₦)']
-                df = df[cols_order]
-        
-        
-                # Save cleaned CSV
-                df.to_excel("3", index=False,engine="openpyxl")
-        
-                # print("Data cleaning complete. Sample data:")
-                # print(df.iloc[73])
-        
-                def add_percentage_to_amount_table(df, amount_column='Amount'):
-                    table = df.copy()
-        
-                    total_amount = table[amount_column].sum()
-        
-                    if total_amount == 0:
-                        table['% of Total'] = 0
-                    else:
-                        table['% of Total'] = (
-                            table[amount_column] / total_amount * 100
-                        ).round(2)
-        
-                    return table
-        
-        
-                def add_percentage_columns(pivot_df,
-                                        debit_col='Debit(₦)',
-                                        credit_col='Credit(₦)'):
-                    """
-                    Adds percentage contribution columns to a pivot table.
-                    Handles cases where totals are zero.
-                    """
-        
-                    df = pivot_df.copy()
-        
-                    # Ensure missing columns are handled safely
-                    if debit_col not in df.columns:
-                        df[debit_col] = 0
-        
-                    if credit_col not in df.columns:
-                        df[credit_col] = 0
-        
-                    # Calculate totals
-                    total_debit = df[debit_col].sum()
-                    total_credit = df[credit_col].sum()
-                    total_flow = total_debit + total_credit
-        
-                    # Protect against division by zero
-                    if total_debit == 0:
-                        df['% Debit'] = 0
-                    else:
-                        df['% Debit'] = (df[debit_col] / total_debit * 100).round(2)
-        
-                    if total_credit == 0:
-                        df['% Credit'] = 0
-                    else:
-                        df['% Credit'] = (df[credit_col] / total_credit * 100).round(2)
-        
-                    if total_flow == 0:
-                        df['% Total Flow'] = 0
-                    else:
-                        df['% Total Flow'] = (
-                            (df[debit_col] + df[credit_col]) / total_flow * 100
-                        ).round(2)
-        
-                    return df
-        
-                import pandas as pd
-        
-                # Load cleaned dataset
-                df = pd.read_excel("3")
-        
-                # Ensure Date column is datetime
-                df['Trans. Date'] = pd.to_datetime(df['Trans. Date'])
-        
-                # Ensure Amount is numeric
-                df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
-        
-                # ========================================
-                # 1️⃣ OVERALL FINANCIAL SUMMARY
-                # ========================================
-        
-                total_debit = df.loc[df['Transaction Type'] == 'Debit(₦)', 'Amount'].sum()
-                total_credit = df.loc[df['Transaction Type'] == 'Credit(₦)', 'Amount'].sum()
-        
-                total_debit_count = df[df['Transaction Type'] == 'Debit(₦)'].shape[0]
-                total_credit_count = df[df['Transaction Type'] == 'Credit(₦)'].shape[0]
-                latest_balance = df.sort_values(
-                    by='Trans. Date'
-                ).iloc[-1]['Balance After(₦)']
-        
-                summary_df = pd.DataFrame({
-                    "Metric": [
-                        "Total Debit Amount",
-                        "Total Credit Amount",
-                        "Number of Debit Transactions",
-                        "Number of Credit Transactions",
-                        "Current Balance"
-                    ],
-                    "Value (₦)": [
-                        total_debit,
-                        total_credit,
-                        total_debit_count,
-                        total_credit_count,
-                        latest_balance
-                    ]
-                })
-        
-                # ========================================
-                # 2️⃣ MONTHLY CASH FLOW SUMMARY (January Format)
-                # ========================================
-        
-                df['Month'] = df['Trans. Date'].dt.month_name()
-        
-                monthly_summary = df.pivot_table(
-                    index='Month',
-                    columns='Transaction Type',
-                    values='Amount',
-                    aggfunc='sum',
-                    fill_value=0
-                )
-                monthly_summary = add_percentage_columns(monthly_summary)
-        
-                # Ensure correct month order
-                month_order = [
-                    "January","February","March","April","May","June",
-                    "July","August","September","October","November","December"
-                ]
-        
-                monthly_summary = monthly_summary.reindex(month_order).dropna(how='all')
-        
-                # ========================================
-                # 3️⃣ PLATFORM PERFORMANCE SUMMARY
-                # ========================================
-        
-                platform_summary = df.pivot_table(
-                    index='Platform',
-                    columns='Transaction Type',
-                    values='Amount',
-                    aggfunc='sum',
-                    fill_value=0
-                )
-                platform_summary = add_percentage_columns(platform_summary)
-        
-                # ========================================
-                # 4️⃣ DAILY TRANSACTION TREND (Better Format)
-                # ========================================
-        
-                df['Date_Only'] = df['Trans. Date'].dt.date
-        
-                daily_summary = df.pivot_table(
-                    index='Date_Only',
-                    columns='Transaction Type',
-                    values='Amount',
-                    aggfunc='sum',
-                    fill_value=0
-                ).sort_index()
-        
-                # ========================================
-                # 5️⃣ TOP 10 SPENDING RECIPIENTS
-                # ========================================
-                import streamlit as st
-        
+            if data:
                 st.title("Top N spender/Recipient")
-        
+
                 number = st.number_input("Enter a number",value= 10)
-        
-                # st.write("You entered:", number)
-                top_spending = (
-                    df[df['Transaction Type'] == 'Debit(₦)']
-                    .groupby('Transaction To/From')['Amount']
-                    .sum()
-                    .sort_values(ascending=False)
-                    .head(int(number))
-                    .reset_index()
-                )
-                top_spending = add_percentage_to_amount_table(top_spending)
-        
+
                 # ========================================
-                # 6️⃣ TOP 10 INCOME SOURCES
+                # ANALYSIS SECTIONS (kept in memory)
                 # ========================================
-        
-                top_income = (
-                    df[df['Transaction Type'] == 'Credit(₦)']
-                    .groupby('Transaction To/From')['Amount']
-                    .sum()
-                    .sort_values(ascending=False)
-                    .head(int(number))
-                    .reset_index()
-                )
-                top_income = add_percentage_to_amount_table(top_income)
-        
+                if merge_history:
+                    df, rows, report, added = merge_upload(account, key, data, number)
+                    st.info(f"History for {account}: {rows} transactions ({added} new from this upload)")
+                else:
+                    # Parsed, cleaned and analysed once per upload (see pipeline.py)
+                    df = clean_statement(key, data)
+                    rows = len(df)
+                    sections, rankings = analyse_statement(key, data)
+                    report = select_top_n(sections, rankings, number)
+
+                # Histories in the SQLite store are queried, never loaded
+                stored = df is None
+
                 # ========================================
-                # WRITE EVERYTHING INTO ONE EXCEL FILE
+                # BALANCE RECONCILIATION (see reconcile.py)
                 # ========================================
-        
-                with pd.ExcelWriter(uploaded_file, engine="openpyxl") as writer:
-                    
-                    # Write cleaned data
-                    df.to_excel(writer, sheet_name="Cleaned_Data", index=False)
-                    
-                    start_row = 0
-                    
-                    # SECTION 1
-                    pd.DataFrame({"OVERALL FINANCIAL SUMMARY": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    summary_df.to_excel(writer, sheet_name="Analysis", startrow=start_row+1, index=False)
-                    start_row += len(summary_df) + 4
-                    
-                    # SECTION 2
-                    pd.DataFrame({"MONTHLY CASH FLOW SUMMARY": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    monthly_summary.to_excel(writer, sheet_name="Analysis", startrow=start_row+1)
-                    start_row += len(monthly_summary) + 4
-                    
-                    # SECTION 3
-                    pd.DataFrame({"PLATFORM PERFORMANCE SUMMARY": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    platform_summary.to_excel(writer, sheet_name="Analysis", startrow=start_row+1)
-                    start_row += len(platform_summary) + 4
-                    
-                    # SECTION 4
-                    pd.DataFrame({"DAILY TRANSACTION TREND": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    daily_summary.to_excel(writer, sheet_name="Analysis", startrow=start_row+1)
-                    start_row += len(daily_summary) + 4
-                    
-                    # SECTION 5
-                    pd.DataFrame({"TOP 10 SPENDING RECIPIENTS": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    top_spending.to_excel(writer, sheet_name="Analysis", startrow=start_row+1, index=False)
-                    start_row += len(top_spending) + 4
-                    
-                    # SECTION 6
-                    pd.DataFrame({"TOP 10 INCOME SOURCES": []}).to_excel(writer, sheet_name="Analysis", startrow=start_row, index=False)
-                    top_income.to_excel(writer, sheet_name="Analysis", startrow=start_row+1, index=False)
-        
-                # print("Analysis successfully written with improved formatting and Naira currency.")
-        
-                import pandas as pd
-        
+                if stored:
+                    checks = stored_reconciliation(SQLITE_PATH, account, rows)
+                elif merge_history:
+                    checks = history_reconciliation(account, df)
+                else:
+                    checks = reconcile_statement(key, data)
+                unchecked = (f"; {checks['unchecked']:,} transactions had no balance to check"
+                             if checks['unchecked'] else "")
+                if checks['ok']:
+                    st.success(f"Balances reconcile across all {checks['rows']:,} transactions")
+                elif not checks['breaks'] and not checks['duplicates']:
+                    st.warning(f"Balances reconcile across the {checks['checked']:,} checked transactions{unchecked}")
+                else:
+                    st.warning(
+                        f"Balances do not reconcile: {checks['breaks']:,} breaks, "
+                        f"{checks['missing_spans']:,} suspected missing spans "
+                        f"(₦{checks['unexplained']:,.2f} unexplained), {checks['duplicates']:,} duplicate rows"
+                        f"{unchecked}"
+                    )
+                    with st.expander("Balance reconciliation"):
+                        st.subheader("Balance breaks")
+                        st.dataframe(checks['break_table'])
+                        st.subheader("Duplicate rows")
+                        st.dataframe(checks['duplicate_table'])
+                        if max(checks['breaks'], checks['duplicates']) > MAX_LISTED:
+                            st.caption(f"Only the first {MAX_LISTED:,} rows of each table are listed")
+
                 # =========================
                 # PROCESS SAVINGS SHEET
                 # =========================
-        
+                savings = analyse_savings(key, data)
+                savings_report = savings['report']
+
+                # ========================================
+                # TRANSACTION CATEGORIES (see categories.py)
+                # ========================================
+                categories = None
                 try:
-                    # CHANGE THIS if your savings sheet has a different name
-                    savings_df = pd.read_excel(uploaded_file, sheet_name='Savings Account Transactions',header=6)
-                    savings_df = savings_df.drop(columns= "Value Date")
-        
-                    # print("Savings sheet loaded successfully.")
-        
-                    # Check if sheet is completely empty
-                    if savings_df.empty:
-                        pass
-                        # print("Savings sheet exists but has no rows. Skipping savings analysis.")
+                    rules_key, rules = category_rules()
+                except ValueError as e:
+                    rules_key = None
+                    st.warning(f"Category rules could not be loaded: {e}")
+                else:
+                    # Stored histories are categorised into daily totals
+                    category_rows = df
+                    if stored:
+                        category_rows, categories = stored_categories(SQLITE_PATH, account, rows, rules_key, rules)
+                    elif merge_history:
+                        categories = history_categories(account, rules_key, df, rules)
                     else:
-                        # print(f"Savings sheet has {len(savings_df)} rows before cleaning.")
-        
-                        # Strip column names (very important)
-                        savings_df.columns = savings_df.columns.str.strip()
-        
-                        # print("Columns found:", savings_df.columns.tolist())
-        
-                        # Expected columns
-                        required_columns = [
-                            'Trans. Date',
-                            'Description',
-                            'Debit(₦)',
-                            'Credit(₦)',
-                            'Balance After(₦)',						
-                            'Channel'	,
-                            'Transaction Reference'
-        
-                        ]
-        
-                        # Validate required columns exist
-                        missing_cols = [col for col in required_columns if col not in savings_df.columns]
-                        if missing_cols:
-                            pass
-                            # print("Missing required columns:", missing_cols)
-                            # print("Check your column names carefully (case-sensitive).")
-                        else:
-        
-                            # Work on a COPY to avoid SettingWithCopyWarning
-                            df_savings = savings_df.copy()
-        
-                            # ----------------------------
-                            # CLEAN DATE COLUMN
-                            # ----------------------------
-                            df_savings.loc[:, 'Trans. Date'] = pd.to_datetime(
-                                df_savings['Trans. Date'],
-                                errors='coerce'
-                            )
-                            # ----------------------------
-                            # CLEAN NUMERIC COLUMNS
-                            # ----------------------------
-                            numeric_cols = ['Debit(₦)', 'Credit(₦)', 'Balance After(₦)']
-        
-                            for col in numeric_cols:
-                                df_savings.loc[:, col] = (
-                                    df_savings[col]
-                                    .astype(str)
-                                    .str.replace(',', '', regex=False)
-                                    .replace('--', '0')
-                                )
-        
-                                df_savings.loc[:, col] = pd.to_numeric(
-                                    df_savings[col],
-                                    errors='coerce'
-                                ).fillna(0)
-        
-                            # Remove rows where Date is NaT
-                            df_savings = df_savings[df_savings['Trans. Date'].notna()]
-        
-                            # print(f"Rows after cleaning: {len(df_savings)}")
-        
-                            if df_savings.empty:
-                                pass
-                                # print("All rows became invalid after cleaning. No savings sheets will be created.")
-                            else:
-        
-                                # =========================
-                                # TOTAL INTEREST
-                                # =========================
-                                interest_df = df_savings[
-                                    df_savings['Description'].str.contains(
-                                        'Interest',
-                                        case=False,
-                                        na=False
-                                    )
-                                ]
-        
-                                total_interest = interest_df['Credit(₦)'].sum()
-        
-                                summary_df = pd.DataFrame({
-                                    'Metric': ['Total Interest Earned'],
-                                    'Value': [total_interest]
-                                })
-        
-                                # print("Total interest calculated:", total_interest)
-        
-                                # =========================
-                                # SAVINGS BALANCE (Latest)
-                                # =========================
-                                latest_balance = df_savings.sort_values(
-                                    by='Trans. Date'
-                                ).iloc[-1]['Balance After(₦)']
-        
-                                balance_df = pd.DataFrame({
-                                    'Metric': ['Latest Savings Balance'],
-                                    'Value': [latest_balance]
-                                })
-        
-                                # =========================
-                                # INTEREST BY SAVINGS TYPE
-                                # =========================
-                                interest_by_type = (
-                                    interest_df
-                                    .groupby('Description')['Credit(₦)']
-                                    .sum()
-                                    .reset_index()
-                                )
-        
-                                # =========================
-                                # BALANCE BY SAVINGS TYPE
-                                # =========================
-                                balance_by_type = (
-                                    df_savings
-                                    .groupby('Description')['Balance After(₦)']
-                                    .max()
-                                    .reset_index()
-                                )
-        
-                # =========================
-                # WRITE EVERYTHING TO ONE SHEET
-                # =========================
-        
-                            from openpyxl import load_workbook
-        
-                            sheet_name = "Savings_Analysis"
-        
-                            # Round currency properly
-                            summary_df["Value"] = summary_df["Value"].round(2)
-                            balance_df["Value"] = balance_df["Value"].round(2)
-        
-                            # Add section titles
-                            summary_df.insert(0, "Section", "TOTAL INTEREST")
-                            balance_df.insert(0, "Section", "LATEST SAVINGS BALANCE")
-                            interest_by_type.insert(0, "Section", "INTEREST BY SAVINGS TYPE")
-                            balance_by_type.insert(0, "Section", "BALANCE BY SAVINGS TYPE")
-        
-                            # Combine everything vertically
-                            final_output = pd.concat(
-                                [
-                                    summary_df,
-                                    pd.DataFrame([[]]),  # blank row
-                                    balance_df,
-                                    pd.DataFrame([[]]),
-                                    interest_by_type,
-                                    pd.DataFrame([[]]),
-                                    balance_by_type
-                                ],
-                                ignore_index=True
-                            )
-        
-                            # Write ONCE
-                            with pd.ExcelWriter(
-                                uploaded_file,
-                                engine="openpyxl",
-                                mode="a",
-                                if_sheet_exists="replace"
-                            ) as writer:
-        
-                                final_output.to_excel(
-                                    writer,
-                                    sheet_name=sheet_name,
-                                    index=False
-                            )
-        
-                        # print("Savings analysis successfully written to single sheet.")
-                        # print(f"{data["name"]}'s file is done")
-        
-        
-                except Exception as e:
-                    # print("Error processing savings sheet:", e)
-                    pass
-                from Dashboardcode import run_dashboard
-            run_dashboard(uploaded_file)
+                        categories = statement_categories(key, rules_key, df, rules)
+                    report[CATEGORY_SECTION] = category_section(category_rows, categories)
+
+                # ========================================
+                # EXCEL REPORT (written only on download)
+                # ========================================
+                export_key = (key, number, account, rows, rules_key)
+                report_buffers = st.session_state.setdefault("report_buffers", {})
+
+                # Runs on click, after this script finished: partial binds
+                # the full report now, so later reassignments cannot leak in
+                if stored:
+                    export = partial(export_stored_report, report_buffers, export_key, SQLITE_PATH, account, report,
+                                     savings_report)
+                else:
+                    export = partial(export_report, report_buffers, export_key, df, report, savings_report)
+                st.download_button(
+                    "Download Excel Report",
+                    data=export,
+                    file_name="statement_analysis.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+                # ========================================
+                # DATE-RANGE / TYPE FILTERS (see filters.py)
+                # ========================================
+                # The dashboard shows view_report; report (and the Excel
+                # download) keeps covering the whole statement
+                view_report = report
+                days = report[DAILY_SECTION]['Date_Only']
+                if len(days):
+                    first, last = days.min(), days.max()
+                    date_range = st.date_input("Date range", value=(first, last), min_value=first, max_value=last)
+                    types = st.multiselect("Transaction type", TRANSACTION_TYPES, default=TRANSACTION_TYPES)
+
+                    # Only index the data once a filter is actually narrowed
+                    filtered = tuple(date_range) != (first, last) or set(types) != set(TRANSACTION_TYPES)
+                    if len(date_range) == 2 and filtered and stored:
+                        view_report = stored_filtered_report(SQLITE_PATH, account, *date_range, types, number)
+                        if categories is not None:
+                            view_report[CATEGORY_SECTION] = category_section(
+                                category_rows, categories, *date_range, types)
+                    elif len(date_range) == 2 and filtered:
+                        index = history_filter_index(account, df) if merge_history else filter_index(key, df)
+                        view_report = filtered_report(index, *date_range, types, number)
+                        if categories is not None:
+                            view_report[CATEGORY_SECTION] = category_section(
+                                df, categories, *date_range, types, days=index['row_days'])
+
+                from Dashboardcode import run_dashboard, run_savings_dashboard
+            with span('chart build'):
+                run_dashboard(view_report)
         with tab2:
+            # Analysed beside the main sheet (see pipeline.process_upload)
+            if savings['error']:
+                st.error(f"Savings analysis failed: {savings['error']}")
+            elif savings_report is None:
+                st.info("No savings transactions in this statement.")
+            else:
+                run_savings_dashboard(savings_report)
+
+            if savings['seconds'] is not None:
+                st.caption(f"Savings analysis took {savings['seconds']:.2f}s")
+        with tab3:
             st.header("Raw Dataset")
-            st.dataframe(df)  # Show the dataset
+
+            # Only the current page is sent to the browser (see dataset_view.py);
+            # stored histories are searched and paged by SQLite itself
+            if not stored:
+                view_index = history_dataset_index(account, df) if merge_history else dataset_index(key, df)
+
+            query = st.text_input("Search name or counterparty")
+
+            filters = {}
+            amount_range = None
+            with st.expander("Filters"):
+                for column in ['Transaction Type', 'Channel', 'Platform']:
+                    values = (stored_values(SQLITE_PATH, account, rows, column) if stored
+                              else list(column_values(df, view_index, column)[1]))
+                    chosen = st.multiselect(column, values, key=f"dataset_{column}")
+                    if chosen:
+                        filters[column] = chosen
+
+                low = st.number_input("Min amount (₦)", value=None, min_value=0.0)
+                high = st.number_input("Max amount (₦)", value=None, min_value=0.0)
+                if low is not None or high is not None:
+                    amount_range = (low if low is not None else -float("inf"),
+                                    high if high is not None else float("inf"))
+
+            col1, col2, col3 = st.columns(3)
+            sort_by = col1.selectbox("Sort by", ["Statement order", *(SQL_COLUMNS if stored else df.columns)])
+            descending = col2.checkbox("Descending")
+            page_size = col3.selectbox("Rows per page", [50, 100, 500, 1000], index=1)
+            sort_by = None if sort_by == "Statement order" else sort_by
+
+            if stored:
+                matching = stored_matching(SQLITE_PATH, account, query, filters, amount_range)
+            else:
+                positions = matching_rows(df, view_index, query, filters, amount_range, sort_by, descending)
+                matching = len(positions)
+            pages = max((matching + page_size - 1) // page_size, 1)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+
+            first_row = (page - 1) * page_size
+            if stored:
+                page_df = stored_page(SQLITE_PATH, account, query, filters, amount_range, sort_by, descending,
+                                      page_size, first_row)
+            else:
+                page_df = df.iloc[positions[first_row:first_row + page_size]]
+            st.dataframe(page_df)
+            shown = f"{first_row + 1:,}-{first_row + len(page_df):,}" if len(page_df) else "0"
+            st.caption(f"Rows {shown} of {matching:,}")
+
+            if not stored and st.checkbox("Show memory usage"):
+                st.dataframe(memory_report(df))
+
+        # Shown once the work is done, not before it starts
+        status.success("FIle Processed and Visualized")
+
+# ========================================
+# DIAGNOSTICS (stage timings of this session)
+# ========================================
+del diagnostics[:-DIAGNOSTICS_MAX_SPANS]
+with st.expander("Diagnostics"):
+    if diagnostics:
+        st.dataframe(diagnostics)
+        st.download_button(
+            "Download diagnostics (JSON)",
+            data=spans_json(diagnostics),
+            file_name="statement_diagnostics.json",
+            mime="application/json"
+        )
+    else:
+        st.caption("No processing recorded yet.")
+
+    usage, total_mb = session_usage()
+    st.caption(f"Memory held for sessions: {total_mb:,.1f} MB of {MEMORY_BUDGET_MB:,.0f} MB")
+    st.dataframe(usage)
+
+# Check on the background job again shortly
+if job is not None and job['status'] in ('queued', 'running'):
+    time.sleep(POLL_SECONDS)
+    st.rerun()
             # st.title("Bank Dashboard")
         
 
-
@@ -0,0 +1,228 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+from multiprocessing.connection import wait
+from pathlib import Path
+
+from analysis import CATEGORY_SECTION, build_report, build_savings_report, category_section, write_report
+from categories import categorise, compile_rules, load_rules
+from cleaning import clean_transactions
+from diagnostics import recording
+from loader import load_statement
+from reconcile import reconcile
+
+
+# =========================================================
+# HEADLESS BATCH PROCESSING
+# =========================================================
+# Usage:
+#   python batch.py statements/ "archive/**/*.xlsx" --output reports/ --workers 4 --timeout 300
+#
+# Every statement is processed in its own worker process (at most
+# --workers at a time) and killed if it runs past --timeout. Each
+# one gets <output>/<name>_report.xlsx, where <name> is its path
+# relative to the inputs' common folder with '__' between folders
+# (so same-named statements in different folders never share a
+# report), and <output>/manifest.json
+# records per-stage timings, the detailed stage spans (see
+# diagnostics.py; --trace-memory adds peak memory), row counts, the
+# balance reconciliation counts and failures for the run.
+STATEMENT_SUFFIXES = ('.xlsx', '.xls')
+MANIFEST_NAME = 'manifest.json'
+
+# Reconciliation counts recorded per file (see reconcile.py)
+RECONCILE_SUMMARY = ['checked', 'unchecked', 'breaks', 'duplicates', 'missing_spans', 'unexplained', 'ok']
+
+
+def find_statements(inputs):
+    """
+    Expands directories (their statement files) and glob patterns
+    into a sorted list of unique paths.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.update(
+            Path(match) for match in matches
+            if Path(match).suffix.lower() in STATEMENT_SUFFIXES and Path(match).is_file()
+        )
+    return sorted(paths)
+
+
+def report_names(paths):
+    """
+    {path: report file name} for the statements, named after their
+    path relative to the common folder of all of them. A name that
+    still clashes gets a short hash of the full path.
+    """
+    paths = [Path(path) for path in paths]
+    if not paths:
+        return {}
+    root = Path(os.path.commonpath([str(path.resolve().parent) for path in paths]))
+
+    names = {}
+    for path in paths:
+        relative = path.resolve().relative_to(root).with_suffix('')
+        names[path] = '__'.join(relative.parts) + '_report.xlsx'
+
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+    for path, name in names.items():
+        if counts[name] > 1:
+            digest = hashlib.sha256(str(path.resolve()).encode('utf-8')).hexdigest()[:8]
+            names[path] = name.replace('_report.xlsx', f'_{digest}_report.xlsx')
+    return names
+
+
+def process_statement(path, output_dir, top_n=10, trace_memory=False, report_name=None):
+    """
+    Cleans and analyses one statement and writes its Excel report
+    (report_name, default <stem>_report.xlsx, in output_dir).
+    Returns the manifest details for the file.
+    """
+    with recording(memory=trace_memory) as spans:
+        details = _process_statement(path, output_dir, top_n, report_name or f"{Path(path).stem}_report.xlsx")
+    details['spans'] = spans
+    return details
+
+
+def _process_statement(path, output_dir, top_n, report_name):
+    timings = {}
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[stage] = round(time.perf_counter() - start, 4)
+        return result
+
+    transactions, savings = timed('load', load_statement, path)
+    df = timed('clean', clean_transactions, transactions)
+    report = timed('analyse', build_report, df, top_n)
+    checks = timed('reconcile', reconcile, df)
+    categories = timed('categorise', categorise, df, compile_rules(load_rules()))
+    report[CATEGORY_SECTION] = category_section(df, categories)
+
+    savings_report = None
+    savings_error = None
+    if savings is not None:
+        try:
+            savings_report = timed('savings', build_savings_report, savings)
+        except Exception as e:
+            savings_error = f"{type(e).__name__}: {e}"
+
+    report_path = Path(output_dir) / report_name
+    timed('write', write_report, report_path, df, report, savings_report)
+
+    return {
+        'rows': len(df),
+        'report': str(report_path),
+        'stages': timings,
+        'reconciliation': {name: checks[name] for name in RECONCILE_SUMMARY},
+        'savings_error': savings_error,
+    }
+
+
+def _worker(conn, path, output_dir, top_n, trace_memory, report_name):
+    try:
+        conn.send(('ok', process_statement(path, output_dir, top_n, trace_memory, report_name)))
+    except Exception as e:
+        conn.send(('failed', {'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()}))
+    finally:
+        conn.close()
+
+
+def run_batch(paths, output_dir, workers=None, timeout=None, top_n=10, trace_memory=False):
+    """
+    Processes paths across worker processes. Returns one manifest
+    entry per file with status 'ok', 'failed' or 'timeout'.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = list(paths)
+    names = report_names(pending)
+    running = {}
+    entries = []
+
+    while pending or running:
+        while pending and len(running) < workers:
+            path = pending.pop(0)
+            receiver, sender = mp.Pipe(duplex=False)
+            proc = mp.Process(target=_worker,
+                              args=(sender, str(path), str(output_dir), top_n, trace_memory, names[Path(path)]),
+                              daemon=True)
+            proc.start()
+            sender.close()
+            running[path] = (proc, receiver, time.perf_counter())
+
+        ready = wait([receiver for _, receiver, _ in running.values()], timeout=0.2)
+        now = time.perf_counter()
+
+        for path, (proc, receiver, start) in list(running.items()):
+            if receiver in ready:
+                try:
+                    status, details = receiver.recv()
+                except EOFError:
+                    status, details = 'failed', {'error': f"worker exited with code {proc.exitcode}"}
+                proc.join()
+            elif timeout and now - start > timeout:
+                proc.terminate()
+                proc.join()
+                status, details = 'timeout', {'error': f"no result after {timeout}s"}
+            else:
+                continue
+
+            receiver.close()
+            del running[path]
+            entries.append({'file': str(path), 'status': status, 'seconds': round(now - start, 4), **details})
+
+    return sorted(entries, key=lambda entry: entry['file'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean and analyse statement workbooks without the UI.")
+    parser.add_argument("inputs", nargs="+", help="statement files, directories or glob patterns")
+    parser.add_argument("--output", "-o", default="reports", help="directory for reports and manifest.json")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", "-t", type=float, default=None, help="seconds allowed per statement")
+    parser.add_argument("--top-n", type=int, default=10, help="rows in the top spending/income sections")
+    parser.add_argument("--trace-memory", action="store_true", help="record peak memory per stage (slower)")
+    args = parser.parse_args(argv)
+
+    paths = find_statements(args.inputs)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    started = datetime.now()
+    run_start = time.perf_counter()
+    entries = run_batch(paths, output_dir, args.workers, args.timeout, args.top_n, args.trace_memory)
+
+    manifest = {
+        'started': started.isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - run_start, 4),
+        'workers': args.workers or os.cpu_count() or 1,
+        'timeout': args.timeout,
+        'processed': sum(entry['status'] == 'ok' for entry in entries),
+        'failed': sum(entry['status'] != 'ok' for entry in entries),
+        'files': entries,
+    }
+
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    print(f"{manifest['processed']} processed, {manifest['failed']} failed in {manifest['seconds']}s; "
+          f"manifest written to {manifest_path}")
+    return 1 if manifest['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import argparse
+import time
+
+import pandas as pd
+
+from loader import available_readers, load_statement
+
+
+# =========================================================
+# EXCEL READER BENCHMARK
+# =========================================================
+# Usage (from the repository root):
+#   python -m benchmarks.readers statement1.xlsx [statement2.xlsx ...] --repeat 3
+def time_reader(path, reader, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = load_statement(path, reader=reader)
+        timings.append(time.perf_counter() - start)
+    return min(timings), frames
+
+
+def same_frames(left, right):
+    """
+    True when two (transactions, savings) results are identical,
+    dtypes included.
+    """
+    for a, b in zip(left, right):
+        if a is None or b is None:
+            if a is not b:
+                return False
+            continue
+        try:
+            pd.testing.assert_frame_equal(a, b)
+        except AssertionError:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Excel reader backends on statement files.")
+    parser.add_argument("paths", nargs="+", help="statement workbooks")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per reader (best is reported)")
+    args = parser.parse_args()
+
+    readers = available_readers()
+    rows = []
+
+    for path in args.paths:
+        baseline = None
+        for reader in readers:
+            seconds, frames = time_reader(path, reader, args.repeat)
+            if baseline is None:
+                baseline = frames
+            rows.append({
+                "File": path,
+                "Reader": reader,
+                "Rows": len(frames[0]),
+                "Best (s)": round(seconds, 3),
+                "Same as " + readers[0]: same_frames(baseline, frames),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
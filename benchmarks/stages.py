@@ -0,0 +1,180 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+from analysis import build_report, build_savings_report, write_report
+from benchmarks.generate import MAX_STATEMENT_ROWS, generate_savings, generate_transactions, write_workbook
+from cleaning import clean_transactions
+from Dashboardcode import extract_sections
+from loader import load_statement
+
+
+# =========================================================
+# STAGE-BY-STAGE BENCHMARK
+# =========================================================
+# Usage (from the repository root):
+#   python -m benchmarks.stages --rows 1000 10000 100000 --repeat 3
+#   python -m benchmarks.stages --compare bench_results/old.json bench_results/new.json
+#
+# Times every stage of a statement's trip through the app on
+# generated OPay workbooks (see benchmarks/generate.py):
+#   ingest    loader.load_statement on the .xlsx file
+#   clean     cleaning.clean_transactions
+#   aggregate analysis.build_report + build_savings_report
+#   export    analysis.write_report into memory
+#   sections  Dashboardcode.extract_sections on the Analysis sheet
+# Results (best and mean per stage and size) are saved as JSON so
+# runs can be compared. Sizes above one .xlsx sheet are cleaned and
+# aggregated from the generated frame; their Excel stages are skipped.
+STAGES = ['ingest', 'clean', 'aggregate', 'export', 'sections']
+SAVINGS_ROWS = 200
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run_once(raw, savings, workbook=None):
+    """
+    {stage: seconds} for one pass through every stage. raw and
+    savings are the generated sheets; workbook is their .xlsx
+    file (None when they do not fit in one).
+    """
+    seconds = {}
+
+    if workbook is not None:
+        seconds['ingest'], (raw, savings) = _timed(load_statement, workbook)
+
+    seconds['clean'], df = _timed(clean_transactions, raw)
+
+    start = time.perf_counter()
+    report = build_report(df)
+    savings_report = build_savings_report(savings) if savings is not None else None
+    seconds['aggregate'] = time.perf_counter() - start
+
+    if workbook is not None:
+        buffer = BytesIO()
+        seconds['export'], _ = _timed(write_report, buffer, df, report, savings_report)
+
+        buffer.seek(0)
+        analysis_sheet = pd.read_excel(buffer, sheet_name="Analysis", header=None)
+        seconds['sections'], _ = _timed(extract_sections, analysis_sheet)
+
+    return seconds
+
+
+def benchmark_size(rows, repeat, seed=0, workbook_dir=None):
+    """
+    Result rows (one per stage) for a generated statement of rows
+    transactions, timed repeat times.
+    """
+    raw = generate_transactions(rows, seed=seed)
+    savings = generate_savings(SAVINGS_ROWS, seed=seed)
+
+    workbook = None
+    if rows <= MAX_STATEMENT_ROWS:
+        workbook = Path(workbook_dir) / f"statement_{rows}_{seed}.xlsx"
+        if not workbook.exists():
+            write_workbook(workbook, raw, savings)
+
+    runs = [run_once(raw, savings, workbook) for _ in range(repeat)]
+
+    results = []
+    for stage in STAGES:
+        timings = [run[stage] for run in runs if stage in run]
+        results.append({
+            'rows': rows,
+            'stage': stage,
+            'best': round(min(timings), 4) if timings else None,
+            'mean': round(sum(timings) / len(timings), 4) if timings else None,
+            'runs': len(timings),
+        })
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes, repeat=3, seed=0, workbook_dir=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+        for rows in sizes:
+            results.extend(benchmark_size(rows, repeat, seed, workbook_dir or tmp))
+
+    return {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def results_table(run):
+    table = pd.DataFrame(run['results']).pivot(index='rows', columns='stage', values='best')
+    return table.reindex(columns=STAGES)
+
+
+def compare_runs(old, new):
+    """
+    Best seconds per size and stage for two saved runs, and the
+    new/old ratio (above 1 means slower).
+    """
+    old_table, new_table = results_table(old), results_table(new)
+    ratio = (new_table / old_table).round(2)
+    return pd.concat({'old (s)': old_table, 'new (s)': new_table, 'new/old': ratio}, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each processing stage on generated OPay statements.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="statement sizes to benchmark (1k to 5M)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size (best and mean are kept)")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed")
+    parser.add_argument("--workbooks", help="directory to keep (and reuse) the generated workbooks")
+    parser.add_argument("--output", "-o", default="bench_results", help="directory for the results JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved results files")
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+
+    if args.compare:
+        old, new = (json.loads(Path(path).read_text(encoding='utf-8')) for path in args.compare)
+        print(compare_runs(old, new).to_string())
+        return
+
+    if args.workbooks:
+        Path(args.workbooks).mkdir(parents=True, exist_ok=True)
+
+    run = run_benchmark(args.rows, args.repeat, args.seed, args.workbooks)
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"stages_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output_path.write_text(json.dumps(run, indent=2), encoding='utf-8')
+
+    print(results_table(run).to_string())
+    print(f"results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cleaning import naira
+from diagnostics import span
+
+
+# =========================================================
+# TRANSACTION CATEGORY RULES
+# =========================================================
+# Rules live in a JSON file (category_rules.json next to this file,
+# or STATEMENT_CATEGORY_RULES=<file>):
+#   {"rules": [{"category": "Transport", "keywords": ["bolt", "uber"],
+#               "counterparties": [...], "platforms": [...],
+#               "min_amount": 0, "max_amount": 5000}, ...]}
+# A rule matches a transaction when every condition it sets holds:
+#   keywords        a word/phrase in To/From, Platform or Extra Info
+#   counterparties  a word/phrase in Transaction Name
+#   platforms       a word/phrase in Platform
+#   min/max_amount  Amount (naira) within the band, inclusive
+# The first matching rule (in file order) gives the category; other
+# transactions are UNCATEGORISED. The file is read again whenever
+# it changes (see rules_version), so edits apply without a restart.
+RULES_PATH = Path(os.environ.get('STATEMENT_CATEGORY_RULES', Path(__file__).with_name('category_rules.json')))
+
+UNCATEGORISED = 'Uncategorised'
+
+# Rule fields holding words/phrases
+WORD_FIELDS = ['keywords', 'counterparties', 'platforms']
+
+# Cleaned columns the rules read (besides the Amount)
+DESCRIPTION_COLUMNS = ['Transaction To/From', 'Transaction Name', 'Platform', 'Extra Info']
+
+
+def rules_version(path=RULES_PATH):
+    """
+    (path, modification time) of the rules file; changes when the
+    file is edited, so it can key caches of compiled rules.
+    """
+    path = Path(path)
+    return str(path), path.stat().st_mtime_ns if path.exists() else None
+
+
+def load_rules(path=RULES_PATH):
+    """
+    The rules of a rules file (no file: no rules), checked and
+    with every field filled in.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+
+    rules = []
+    for position, rule in enumerate(json.loads(path.read_text(encoding='utf-8')).get('rules', [])):
+        if not rule.get('category'):
+            raise ValueError(f"{path}: rule {position} has no category")
+
+        checked = {'category': str(rule['category'])}
+        for field in WORD_FIELDS:
+            words = rule.get(field, [])
+            if isinstance(words, str):
+                words = [words]
+            checked[field] = [str(word).strip().lower() for word in words if str(word).strip()]
+
+        checked['min_amount'] = float(rule.get('min_amount') if rule.get('min_amount') is not None else -np.inf)
+        checked['max_amount'] = float(rule.get('max_amount') if rule.get('max_amount') is not None else np.inf)
+        if checked['min_amount'] > checked['max_amount']:
+            raise ValueError(f"{path}: rule {position} has min_amount above max_amount")
+
+        rules.append(checked)
+    return rules
+
+
+def _word_matcher(words):
+    """
+    One pattern finding any of words as whole words/phrases at
+    every position, so overlapping words are all found. Where
+    several start at one position only the longest is returned
+    (see _with_prefixes for the others).
+    """
+    if not words:
+        return None
+    alternatives = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(rf'(?<!\w)(?=({alternatives})(?!\w))')
+
+
+def _with_prefixes(users):
+    """
+    users ({word: rules}) with each word also mapped to the rules
+    of the words it starts with as a whole word ('pos purchase'
+    also holds 'pos'), in rule order.
+    """
+    expanded = {}
+    for word in users:
+        rules = set()
+        for other, other_rules in users.items():
+            if word == other or (word.startswith(other) and not re.match(r'\w', word[len(other)])):
+                rules.update(other_rules)
+        expanded[word] = sorted(rules)
+    return expanded
+
+
+def compile_rules(rules):
+    """
+    The rules as one matcher per word field (every rule's words
+    in a single pattern, each word mapped to the rules using it)
+    plus arrays of the amount bands.
+    """
+    matchers = {}
+    for field in WORD_FIELDS:
+        users = {}
+        for position, rule in enumerate(rules):
+            for word in rule[field]:
+                users.setdefault(word, []).append(position)
+        needed = np.array([bool(rule[field]) for rule in rules], dtype=bool)
+        matchers[field] = (_word_matcher(users), _with_prefixes(users), needed)
+
+    categories = list(dict.fromkeys(rule['category'] for rule in rules))
+    if UNCATEGORISED not in categories:
+        categories.append(UNCATEGORISED)
+
+    return {
+        'rules': len(rules),
+        'matchers': matchers,
+        'min_amount': np.array([rule['min_amount'] for rule in rules], dtype=float),
+        'max_amount': np.array([rule['max_amount'] for rule in rules], dtype=float),
+        'category_codes': np.array([categories.index(rule['category']) for rule in rules], dtype=np.int64),
+        'categories': categories,
+    }
+
+
+def _text(df, column):
+    return df[column].astype(object).fillna('').astype(str).str.lower()
+
+
+def _word_hits(texts, matcher, n_rules):
+    """
+    (texts x rules) booleans: which rules' words each text holds.
+    """
+    pattern, users, _ = matcher
+    hits = np.zeros((len(texts), n_rules), dtype=bool)
+    if pattern is None:
+        return hits
+
+    found = texts.reset_index(drop=True).str.findall(pattern).explode().dropna()
+    rules = found.map(users).explode()
+    hits[rules.index.to_numpy(), rules.to_numpy(dtype=np.int64)] = True
+    return hits
+
+
+def categorise(df, compiled):
+    """
+    Category of every transaction of a cleaned frame (either
+    layout), as a categorical Series. Word rules are matched once
+    per distinct description; only the amount bands are checked
+    per row.
+    """
+    with span('categorisation', rows=len(df)):
+        categories = compiled['categories']
+        if not compiled['rules'] or df.empty:
+            codes = np.full(len(df), categories.index(UNCATEGORISED))
+            return pd.Series(pd.Categorical.from_codes(codes, categories), index=df.index, name='Category')
+
+        # Distinct descriptions (the parsed fields the rules read)
+        keys = df.groupby(DESCRIPTION_COLUMNS, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+        _, first = np.unique(keys, return_index=True)
+        distinct = df.iloc[first]
+
+        texts = {
+            'keywords': _text(distinct, 'Transaction To/From') + '|' + _text(distinct, 'Platform') + '|'
+            + _text(distinct, 'Extra Info'),
+            'counterparties': _text(distinct, 'Transaction Name'),
+            'platforms': _text(distinct, 'Platform').str.strip(),
+        }
+
+        # Rules whose word conditions hold, per distinct description
+        words_ok = np.ones((len(distinct), compiled['rules']), dtype=bool)
+        for field, matcher in compiled['matchers'].items():
+            words_ok &= _word_hits(texts[field], matcher, compiled['rules']) | ~matcher[2]
+
+        amount = naira(df, 'Amount').fillna(0).to_numpy(dtype=float)[:, None]
+        ok = words_ok[keys] & (amount >= compiled['min_amount']) & (amount <= compiled['max_amount'])
+
+        first_rule = ok.argmax(axis=1)
+        matched = ok[np.arange(len(df)), first_rule]
+        codes = np.where(matched, compiled['category_codes'][first_rule], categories.index(UNCATEGORISED))
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=df.index, name='Category')
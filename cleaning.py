@@ -0,0 +1,259 @@
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import span
+
+
+# =========================================================
+# CLEANED DATASET LAYOUT
+# =========================================================
+DESC_COLUMNS = ['Transaction To/From', 'Platform', 'Account/Phone', 'Extra Info']
+
+COLS_ORDER = ['Transaction Reference', 'Trans. Date', 'Time', 'Transaction Type', 'Transaction To/From',
+              'Transaction Name', 'Account/Phone', 'Platform', 'Channel', 'Extra Info', 'Amount',
+              'Balance After(₦)']
+
+DATE_FORMAT = '%d %b %Y %H:%M:%S'
+
+# Compact layout (see compact_transactions): money columns become
+# integer kobo under these names, 'Trans. Date' holds the full
+# timestamp (no 'Time' column) and repetitive text columns are
+# categoricals.
+KOBO_COLUMNS = {'Amount': 'Amount (kobo)', 'Balance After(₦)': 'Balance After (kobo)'}
+
+CATEGORY_COLUMNS = ['Transaction Type', 'Transaction To/From', 'Transaction Name', 'Account/Phone', 'Platform',
+                    'Channel', 'Extra Info']
+
+# Text columns become categoricals below this distinct/rows ratio
+CATEGORY_MAX_RATIO = 0.5
+
+# 'from' / 'to' as whole words only (not inside 'Photo', 'Toyota')
+_FROM_KEYWORD = re.compile(r'\bfrom\b')
+_TO_KEYWORD = re.compile(r'\bto\b')
+
+# Text after the first keyword, up to the next keyword or '|'
+_FROM_PATTERN = re.compile(r'\bfrom\b((?:(?!\bfrom\b)[^|])*)', re.DOTALL)
+_TO_PATTERN = re.compile(r'\bto\b((?:(?!\bto\b)[^|])*)', re.DOTALL)
+
+
+# =========================================================
+# COLUMN-WISE CLEANING STEPS
+# =========================================================
+def parse_amount(series):
+    """
+    Converts a Debit/Credit/Balance column ('--' placeholders
+    and comma thousands separators) to float.
+    """
+    return series.replace('--', 0).replace(',', '', regex=True).astype(float)
+
+
+def extract_names(descriptions):
+    """
+    Extracts the counterparty name from every Description at once:
+    text after the word 'from', else after the word 'to', else the
+    first '|' field, title-cased.
+    """
+    desc = descriptions.astype(object).astype(str)
+    lower = desc.str.lower()
+
+    has_from = lower.str.contains(_FROM_KEYWORD)
+    has_to = lower.str.contains(_TO_KEYWORD)
+
+    name = desc.str.split('|', n=1).str[0]
+    name = name.where(~has_to, lower.str.extract(_TO_PATTERN, expand=False))
+    name = name.where(~has_from, lower.str.extract(_FROM_PATTERN, expand=False))
+
+    return name.str.strip().str.title()
+
+
+def split_description(descriptions):
+    """
+    Splits Description on '|' into the DESC_COLUMNS fields and
+    puts Platform and Account/Phone back in place when the
+    statement has them swapped.
+    """
+    splits = descriptions.str.split('|', n=len(DESC_COLUMNS) - 1, expand=True)
+    splits = splits.reindex(columns=range(len(DESC_COLUMNS)))
+    splits.columns = DESC_COLUMNS
+    splits = splits.astype(object)
+
+    platform = splits['Platform'].str.strip()
+    account = splits['Account/Phone'].str.strip()
+
+    # Platform is all digits and Account/Phone holds a network name
+    swapped = (
+        platform.str.replace(' ', '', regex=False).str.isdigit().fillna(False).astype(bool)
+        & account.str.contains(r'[^\W\d_]', regex=True).fillna(False).astype(bool)
+    )
+
+    splits.loc[swapped, 'Platform'] = account[swapped]
+    splits.loc[swapped, 'Account/Phone'] = platform[swapped]
+
+    return splits
+
+
+def parse_descriptions(descriptions):
+    """
+    'Transaction Name' and the DESC_COLUMNS fields of every
+    Description. Statements repeat the same descriptions a lot,
+    so each distinct one is parsed once and mapped back to its
+    rows.
+    """
+    codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=descriptions.dtype)
+
+    parsed = pd.concat([extract_names(uniques).rename('Transaction Name'), split_description(uniques)], axis=1)
+    return parsed.take(codes).set_axis(descriptions.index)
+
+
+# =========================================================
+# MAIN CLEANING FUNCTION
+# =========================================================
+def clean_transactions(df, compact=False):
+    """
+    Cleans the raw transaction sheet (read with the statement
+    header row) into the COLS_ORDER layout used by the analysis,
+    or straight into the compact layout when compact is True.
+    """
+    df = df.copy()
+    rows = len(df)
+
+    # Convert 'Trans. Date' to datetime and extract Date/Time
+    with span('date conversion', rows=rows):
+        trans_date = pd.to_datetime(df['Trans. Date'], format=DATE_FORMAT)
+        if compact:
+            df['Trans. Date'] = trans_date
+        else:
+            df['Trans. Date'] = trans_date.dt.date
+            df['Time'] = trans_date.dt.time
+
+    # Handle Debit and Credit
+    with span('amount parse', rows=rows):
+        debit = parse_amount(df['Debit(₦)'])
+        credit = parse_amount(df['Credit(₦)'])
+
+        # Create transaction type and unified amount
+        is_debit = (debit > 0).to_numpy()
+        df['Transaction Type'] = np.where(is_debit, 'Debit(₦)', 'Credit(₦)')
+        df['Amount'] = np.where(is_debit, debit, credit)
+
+        # Balances arrive as comma-formatted text too; every reader
+        # (and the compact kobo column) needs numbers
+        df['Balance After(₦)'] = parse_amount(df['Balance After(₦)'])
+
+    with span('description parse', rows=rows):
+        df = pd.concat([df, parse_descriptions(df['Description'])], axis=1)
+
+    if compact:
+        with span('compact layout', rows=rows):
+            return compact_transactions(df[[col for col in COLS_ORDER if col != 'Time']])
+    return df[COLS_ORDER]
+
+
+# =========================================================
+# COMPACT LAYOUT (smaller per-session footprint)
+# =========================================================
+def compact_column_names(columns):
+    """
+    The compact layout's names for the given cleaned columns.
+    """
+    return [KOBO_COLUMNS.get(col, col) for col in columns if col != 'Time']
+
+
+def to_kobo(values):
+    kobo = (pd.to_numeric(values, errors='coerce') * 100).round()
+    return kobo.astype('int64') if kobo.notna().all() else kobo.astype('Int64')
+
+
+def compact_transactions(df):
+    """
+    Compact copy of a cleaned frame (any subset of COLS_ORDER):
+    'Trans. Date' and 'Time' as one datetime64 'Trans. Date',
+    amounts as integer kobo (KOBO_COLUMNS) and text columns with
+    few distinct values as categoricals.
+    """
+    compact = df.copy()
+
+    if 'Time' in compact.columns:
+        time = pd.to_timedelta(compact.pop('Time').astype(str), errors='coerce').fillna(pd.Timedelta(0))
+        compact['Trans. Date'] = pd.to_datetime(compact['Trans. Date']) + time
+    elif 'Trans. Date' in compact.columns:
+        compact['Trans. Date'] = pd.to_datetime(compact['Trans. Date'])
+
+    for col, kobo_col in KOBO_COLUMNS.items():
+        if col in compact.columns:
+            compact[col] = to_kobo(compact[col])
+    compact = compact.rename(columns=KOBO_COLUMNS)
+
+    for col in CATEGORY_COLUMNS:
+        if col in compact.columns and compact[col].nunique() <= CATEGORY_MAX_RATIO * len(compact):
+            compact[col] = compact[col].astype('category')
+
+    return compact
+
+
+def is_compact(df):
+    return any(col in df.columns for col in KOBO_COLUMNS.values())
+
+
+def naira(df, column):
+    """
+    A money column (e.g. 'Amount') as float naira, from either
+    layout.
+    """
+    if column in df.columns:
+        return pd.to_numeric(df[column], errors='coerce')
+    return df[KOBO_COLUMNS[column]].astype('float64') / 100
+
+
+def expand_transactions(df):
+    """
+    The COLS_ORDER layout (date and time objects, float amounts,
+    plain text) of a compact frame; other frames are returned
+    unchanged.
+    """
+    if not is_compact(df):
+        return df
+
+    expanded = df.copy()
+    for col, kobo_col in KOBO_COLUMNS.items():
+        if kobo_col in expanded.columns:
+            expanded[kobo_col] = naira(expanded, col)
+    expanded = expanded.rename(columns={kobo_col: col for col, kobo_col in KOBO_COLUMNS.items()})
+
+    for col in expanded.select_dtypes('category').columns:
+        expanded[col] = expanded[col].astype(object)
+
+    if 'Trans. Date' in expanded.columns:
+        timestamps = expanded['Trans. Date']
+        expanded['Trans. Date'] = timestamps.dt.date
+        expanded.insert(expanded.columns.get_loc('Trans. Date') + 1, 'Time', timestamps.dt.time)
+
+    return expanded
+
+
+def memory_report(df):
+    """
+    Deep memory use of every column (bytes and dtype), with a
+    'Total' row.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'Column': usage.index, 'dtype': df.dtypes.astype(str).to_numpy(), 'Bytes': usage.to_numpy()})
+    total = pd.DataFrame({'Column': ['Total'], 'dtype': [''], 'Bytes': [usage.sum()]})
+    return pd.concat([report, total], ignore_index=True)
+
+
+if __name__ == "__main__":
+    from loader import load_statement
+
+    # Usage: python cleaning.py statement1.xlsx [statement2.xlsx ...]
+    # prints the memory of both layouts (tests/test_cleaning.py checks
+    # the cleaning against the original row-wise code)
+    for path in sys.argv[1:]:
+        transactions, _ = load_statement(path)
+        standard = memory_report(clean_transactions(transactions))['Bytes'].iloc[-1]
+        compact = memory_report(clean_transactions(transactions, compact=True))['Bytes'].iloc[-1]
+        print(f"{path}: {standard / 1e6:.1f} MB cleaned, {compact / 1e6:.1f} MB compact")
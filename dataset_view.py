@@ -0,0 +1,132 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from cleaning import naira
+from diagnostics import span
+
+
+# =========================================================
+# PAGINATED DATASET VIEW
+# =========================================================
+# The Dataset tab only sends one page of rows to the browser. The
+# index built once per dataset holds:
+#   - a token index for the free-text search: every distinct
+#     (Transaction Name, Transaction To/From) pair is tokenised once
+#     and each token lists the pairs holding it, so a search is a
+#     few binary searches over the sorted tokens plus one lookup per
+#     row;
+#   - per-column sort orders and value codes, built the first time
+#     a column is sorted or filtered on and reused afterwards.
+# Filtering and sorting a page is then a handful of numpy passes.
+SEARCH_COLUMNS = ['Transaction Name', 'Transaction To/From']
+
+_TOKEN = re.compile(r'\w+')
+
+
+def build_dataset_index(df):
+    with span('dataset index', rows=len(df)):
+        return _build_dataset_index(df)
+
+
+def _build_dataset_index(df):
+    pairs = df.groupby(SEARCH_COLUMNS, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    _, first = np.unique(pairs, return_index=True)
+    distinct = df.iloc[first]
+
+    text = (distinct['Transaction Name'].astype(object).fillna('').astype(str) + ' '
+            + distinct['Transaction To/From'].astype(object).fillna('').astype(str)).str.lower()
+
+    # One (token, pair) entry per token of each distinct pair
+    tokens = text.reset_index(drop=True).str.findall(_TOKEN).explode().dropna()
+    postings = pd.DataFrame({'token': tokens.to_numpy(dtype=object), 'pair': tokens.index.to_numpy()})
+    postings = postings.drop_duplicates().sort_values('token', kind='stable')
+
+    return {
+        'rows': len(df),
+        'pairs': pairs,
+        'n_pairs': len(distinct),
+        'tokens': postings['token'].to_numpy(dtype=str),
+        'token_pairs': postings['pair'].to_numpy(dtype=np.int64),
+        'orders': {},
+        'codes': {},
+        'values': {},
+    }
+
+
+def search_mask(index, query):
+    """
+    Rows whose Transaction Name or To/From hold every word of
+    query (words match token prefixes), or None for no query.
+    """
+    words = _TOKEN.findall(query.lower())
+    if not words:
+        return None
+
+    hit = np.ones(index['n_pairs'], dtype=bool)
+    for word in words:
+        lo = np.searchsorted(index['tokens'], word, side='left')
+        hi = np.searchsorted(index['tokens'], word + '\U0010ffff', side='left')
+        has_word = np.zeros(index['n_pairs'], dtype=bool)
+        has_word[index['token_pairs'][lo:hi]] = True
+        hit &= has_word
+    return hit[index['pairs']]
+
+
+def column_values(df, index, column):
+    """
+    (codes per row, distinct values sorted) of a column, built
+    once per column.
+    """
+    if column not in index['codes']:
+        index['codes'][column] = pd.factorize(df[column], sort=True)
+    return index['codes'][column]
+
+
+def _sort_order(df, index, column, descending):
+    """
+    Row positions sorted by column, missing values last either way.
+    """
+    if (column, descending) not in index['orders']:
+        codes, _ = column_values(df, index, column)
+        order = np.argsort(np.where(codes < 0, len(codes), codes), kind='stable')
+        if descending:
+            n_missing = int((codes < 0).sum())
+            order = np.concatenate([order[:len(order) - n_missing][::-1], order[len(order) - n_missing:]])
+        index['orders'][(column, descending)] = order
+    return index['orders'][(column, descending)]
+
+
+def _amounts(df, index):
+    if 'Amount' not in index['values']:
+        index['values']['Amount'] = naira(df, 'Amount').to_numpy(dtype=float)
+    return index['values']['Amount']
+
+
+def matching_rows(df, index, query='', filters=None, amount_range=None, sort_by=None, descending=False):
+    """
+    Positions of the rows matching the search query, filters
+    ({column: values to keep}) and amount_range ((min, max)
+    naira, inclusive), in sort_by order (statement order if None).
+    A page is then df.iloc[positions[start:start + page_size]].
+    """
+    mask = search_mask(index, query)
+    if mask is None:
+        mask = np.ones(index['rows'], dtype=bool)
+
+    for column, keep in (filters or {}).items():
+        codes, values = column_values(df, index, column)
+        wanted = np.zeros(len(values) + 1, dtype=bool)
+        positions = pd.Index(values).get_indexer(list(keep))
+        wanted[positions[positions >= 0]] = True
+        mask &= wanted[codes]
+
+    if amount_range is not None:
+        amounts = _amounts(df, index)
+        mask &= (amounts >= amount_range[0]) & (amounts <= amount_range[1])
+
+    if sort_by is None:
+        return np.flatnonzero(mask)
+    order = _sort_order(df, index, sort_by, descending)
+    return order[mask[order]]
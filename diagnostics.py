@@ -0,0 +1,100 @@
+import contextvars
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# =========================================================
+# STAGE INSTRUMENTATION (SPANS)
+# =========================================================
+# Stages wrap their work in span(name, rows=...). While a list is
+# being recorded into (see recording / record_into), every span
+# appends {'span', 'rows', 'seconds', 'peak_mb', 'started'} to it
+# and is also logged as one JSON line on the 'statement.diagnostics'
+# logger. Outside a recording, span() costs next to nothing.
+#
+# Peak memory uses tracemalloc, which slows pandas work down a
+# lot, so it is only measured when the recording asks for it.
+LOGGER = logging.getLogger('statement.diagnostics')
+
+_recording = contextvars.ContextVar('diagnostics_recording', default=None)
+
+
+def record_into(spans, memory=False):
+    """
+    Records the spans of the current thread/context into spans
+    (a list) from now on; with memory=True peak memory is traced
+    (tracemalloc is started if needed and left running).
+    """
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _recording.set({'spans': spans, 'memory': memory, 'open': []})
+
+
+def stop_recording():
+    _recording.set(None)
+
+
+@contextmanager
+def recording(spans=None, memory=False):
+    """
+    with recording() as spans: ... collects the spans opened in
+    the block (and stops tracemalloc again if it started it).
+    """
+    spans = [] if spans is None else spans
+    started_tracing = memory and not tracemalloc.is_tracing()
+    record_into(spans, memory)
+    try:
+        yield spans
+    finally:
+        stop_recording()
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def span(name, rows=None):
+    """
+    Times the block as one stage. Yields the span record, so the
+    rows processed can be set once they are known.
+    """
+    state = _recording.get()
+    record = {'span': name, 'rows': rows}
+    if state is None:
+        yield record
+        return
+
+    tracing = state['memory'] and tracemalloc.is_tracing()
+    if tracing:
+        # Nested spans reset the peak; the enclosing one keeps
+        # the highest peak seen so far in its 'open' entry
+        current, peak = tracemalloc.get_traced_memory()
+        if state['open']:
+            state['open'][-1]['peak'] = max(state['open'][-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        state['open'].append({'base': current, 'peak': current})
+
+    record['started'] = datetime.now().isoformat(timespec='milliseconds')
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        record['peak_mb'] = None
+
+        if tracing:
+            opened = state['open'].pop()
+            peak = max(opened['peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = round(max(peak - opened['base'], 0) / 2 ** 20, 2)
+            if state['open']:
+                state['open'][-1]['peak'] = max(state['open'][-1]['peak'], peak)
+
+        state['spans'].append(record)
+        LOGGER.info(json.dumps(record))
+
+
+def spans_json(spans):
+    return json.dumps(spans, indent=2)
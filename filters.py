@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from analysis import (DAILY_SECTION, INCOME_SECTION, MONTHLY_SECTION, PLATFORM_SECTION, SPENDING_SECTION,
+                      SUMMARY_SECTION, TRANSACTION_TYPES, add_percentage_columns, build_cube, chronological_order,
+                      finish_sections, monthly_section, ranking_table, summary_section, top_counterparties,
+                      transaction_timestamps)
+from cleaning import naira
+from diagnostics import span
+
+
+# =========================================================
+# DATE-RANGE / TRANSACTION-TYPE FILTER INDEX
+# =========================================================
+# Built once per dataset. Transactions are sorted by timestamp and
+# carry running (prefix) sums of amount (in whole kobo, so window
+# differences are exact) and count per transaction type, so a
+# window's KPI totals are two binary searches and two subtractions.
+# The aggregation cube is sorted by day with every level stored as
+# integer codes, so a window's charts and rankings are np.bincount
+# roll-ups of one contiguous slice of the cube.
+def _prefix(values):
+    return np.concatenate([[0], np.cumsum(values)])
+
+
+def _type_codes(types):
+    """
+    Position of each value in TRANSACTION_TYPES (-1 if absent).
+    """
+    return pd.Index(TRANSACTION_TYPES).get_indexer(types)
+
+
+def build_filter_index(df):
+    with span('filter index', rows=len(df)):
+        return _build_filter_index(df)
+
+
+def _build_filter_index(df):
+    timestamps = transaction_timestamps(df).to_numpy()
+    order = chronological_order(timestamps)
+
+    amount = naira(df, 'Amount').fillna(0).to_numpy()[order]
+    kobo = np.rint(amount * 100).astype(np.int64)
+    types = _type_codes(df['Transaction Type'])[order]
+
+    prefix = {}
+    for code, transaction_type in enumerate(TRANSACTION_TYPES):
+        is_type = types == code
+        prefix[transaction_type] = (_prefix(np.where(is_type, kobo, 0)), _prefix(is_type.astype(np.int64)))
+
+    cube = build_cube(df)
+    cube_dates = cube.index.get_level_values('Date_Only').to_numpy()
+    cube_order = np.argsort(cube_dates, kind='stable')
+
+    day_codes, days = pd.factorize(cube_dates[cube_order], sort=True)
+    platform_codes, platforms = pd.factorize(cube.index.get_level_values('Platform')[cube_order], sort=True)
+    party_codes, parties = pd.factorize(cube.index.get_level_values('Transaction To/From')[cube_order], sort=True)
+
+    return {
+        'timestamps': timestamps[order],
+        'row_days': timestamps.astype('datetime64[D]'),
+        'balances': naira(df, 'Balance After(₦)').to_numpy()[order],
+        'prefix': prefix,
+        'cube': {
+            'dates': cube_dates[cube_order],
+            'type': _type_codes(cube.index.get_level_values('Transaction Type')[cube_order]),
+            'day': (day_codes, days),
+            'platform': (platform_codes, platforms),
+            'party': (party_codes, parties),
+            'Amount': cube['Amount'].to_numpy()[cube_order],
+            'Count': cube['Count'].to_numpy()[cube_order],
+        },
+    }
+
+
+def _day_bounds(sorted_times, start, end):
+    """
+    Positions of the first row on/after start and the first row
+    after end (both dates, inclusive) in a sorted datetime array.
+    """
+    bounds = np.array([pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)], dtype='datetime64[ns]')
+    lo, hi = np.searchsorted(sorted_times, bounds.astype(sorted_times.dtype))
+    return int(lo), int(hi)
+
+
+def window_totals(index, start, end, types=TRANSACTION_TYPES):
+    """
+    {type: (amount, count)} for transactions from start to end
+    (dates, inclusive) of the given types, and the balance after
+    the window's last transaction of any type (None if the window
+    is empty).
+    """
+    lo, hi = _day_bounds(index['timestamps'], start, end)
+
+    totals = {}
+    for transaction_type, (amounts, counts) in index['prefix'].items():
+        if transaction_type in types:
+            totals[transaction_type] = ((amounts[hi] - amounts[lo]) / 100, int(counts[hi] - counts[lo]))
+        else:
+            totals[transaction_type] = (0.0, 0)
+
+    balance = index['balances'][hi - 1] if hi > lo else None
+    return totals, balance
+
+
+def _rollup(level, types, *weights):
+    """
+    Sums of each weights array per level label x transaction type,
+    for the labels that have rows of a selected type (types >= 0),
+    like analysis._type_rollup. Other rows land in a spare last
+    bin that is dropped, so the slice is never copied.
+    """
+    codes, labels = level
+    n_types = len(TRANSACTION_TYPES)
+    n_bins = len(labels) * n_types
+    bins = np.where((codes >= 0) & (types >= 0), codes * n_types + types, n_bins)
+
+    present = np.bincount(bins, minlength=n_bins + 1)[:-1].reshape(len(labels), n_types).any(axis=1)
+    return [
+        pd.DataFrame(
+            np.bincount(bins, weights=values, minlength=n_bins + 1)[:-1].reshape(len(labels), n_types)[present],
+            index=labels[present],
+            columns=TRANSACTION_TYPES
+        )
+        for values in weights
+    ]
+
+
+def filtered_report(index, start, end, types=TRANSACTION_TYPES, top_n=10):
+    """
+    Every Analysis section restricted to start..end (dates,
+    inclusive) and the given transaction types.
+    """
+    totals, balance = window_totals(index, start, end, types)
+
+    cube = index['cube']
+    lo, hi = _day_bounds(cube['dates'], start, end)
+    window = {key: (values[0][lo:hi], values[1]) if isinstance(values, tuple) else values[lo:hi]
+              for key, values in cube.items()}
+
+    # Deselected (and unknown) types become -1, which roll-ups skip
+    lookup = np.full(len(TRANSACTION_TYPES) + 1, -1)
+    selected = _type_codes(list(types))
+    lookup[selected[selected >= 0] + 1] = selected[selected >= 0]
+    window['type'] = lookup[window['type'] + 1]
+
+    daily, = _rollup(window['day'], window['type'], window['Amount'])
+    daily.index = pd.DatetimeIndex(daily.index)
+    platform_summary, = _rollup(window['platform'], window['type'], window['Amount'])
+    party_amounts, party_counts = _rollup(window['party'], window['type'], window['Amount'], window['Count'])
+
+    rankings = {
+        transaction_type: ranking_table(party_amounts.loc[party_counts[transaction_type] > 0, transaction_type])
+        for transaction_type in TRANSACTION_TYPES
+    }
+
+    report = finish_sections({
+        SUMMARY_SECTION: summary_section(
+            totals['Debit(₦)'][0],
+            totals['Credit(₦)'][0],
+            totals['Debit(₦)'][1],
+            totals['Credit(₦)'][1],
+            balance if balance is not None else 0
+        ),
+        MONTHLY_SECTION: monthly_section(daily.groupby(daily.index.to_period('M')).sum()),
+        PLATFORM_SECTION: add_percentage_columns(platform_summary.rename_axis('Platform')),
+        DAILY_SECTION: daily.set_axis(pd.Index(daily.index.date, name='Date_Only')),
+    })
+    report[SPENDING_SECTION] = top_counterparties(rankings['Debit(₦)'], top_n)
+    report[INCOME_SECTION] = top_counterparties(rankings['Credit(₦)'], top_n)
+    return report
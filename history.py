@@ -0,0 +1,141 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analysis import (build_cube, chronological_order, merge_cubes, rankings_from_cube, sections_from_cube,
+                      transaction_timestamps)
+from diagnostics import span
+from storage import load_cleaned, save_cleaned
+
+
+# =========================================================
+# PER-ACCOUNT TRANSACTION HISTORY
+# =========================================================
+# Overlapping statements of one account are merged into a single
+# history. Rows are identified by 'Transaction Reference' (kept in
+# a set, so checking a new statement costs one lookup per row) and
+# only rows not seen before are appended. The history keeps the
+# aggregation cube (see analysis.build_cube) of its rows; new rows
+# only add to the day/platform/counterparty cells they touch, and
+# the Analysis sections are roll-ups of that cube.
+KEY_FALLBACK_COLUMNS = ['Trans. Date', 'Time', 'Transaction Type', 'Amount', 'Transaction To/From']
+
+
+def new_history(account):
+    return {
+        'account': account,
+        'chunks': [],
+        'references': set(),
+        'uploads': set(),
+        'cube': None,
+        'latest': None,
+    }
+
+
+def row_keys(df):
+    """
+    'Transaction Reference' as text; rows without one fall back
+    to a key built from their date, time, type, amount and party.
+    """
+    references = df['Transaction Reference']
+    keys = references.astype(object).astype(str)
+
+    missing = references.isna()
+    if missing.any():
+        parts = df.loc[missing, KEY_FALLBACK_COLUMNS].astype(str)
+        fallback = parts.iloc[:, 0]
+        for col in KEY_FALLBACK_COLUMNS[1:]:
+            fallback = fallback + '|' + parts[col]
+        keys[missing] = fallback
+
+    return keys
+
+
+def merge_statement(history, df, upload=None):
+    """
+    Appends the rows of a cleaned statement that are not in the
+    history yet and updates only the partitions they touch.
+    upload (e.g. the content hash) marks the statement as merged
+    so merging it again is skipped. Returns the rows added.
+    """
+    if upload is not None:
+        if upload in history['uploads']:
+            return 0
+        history['uploads'].add(upload)
+
+    keys = row_keys(df)
+    known = history['references']
+    is_new = ~keys.duplicated().to_numpy() & np.fromiter(
+        (key not in known for key in keys), dtype=bool, count=len(keys)
+    )
+
+    new = df[is_new].reset_index(drop=True)
+    if new.empty:
+        return 0
+
+    known.update(keys[is_new])
+    history['chunks'].append(new)
+
+    with span('history merge', rows=len(new)):
+        new_cube = build_cube(new)
+        history['cube'] = new_cube if history['cube'] is None else merge_cubes(history['cube'], new_cube)
+
+    # Latest balance by full timestamp
+    timestamps = transaction_timestamps(new)
+    last = int(chronological_order(timestamps)[-1])
+    if history['latest'] is None or timestamps.iloc[last] >= history['latest'][0]:
+        history['latest'] = (timestamps.iloc[last], new['Balance After(₦)'].iloc[last])
+
+    return len(new)
+
+
+def history_transactions(history):
+    """
+    Every transaction merged into the history (cleaned layout).
+    """
+    if not history['chunks']:
+        return pd.DataFrame()
+    if len(history['chunks']) > 1:
+        history['chunks'] = [pd.concat(history['chunks'], ignore_index=True)]
+    return history['chunks'][0]
+
+
+def history_sections(history):
+    """
+    (sections, rankings) for the whole history, in the layout of
+    analysis.build_sections and analysis.rank_counterparties.
+    """
+    cube = history['cube']
+    if cube is None:
+        cube = build_cube(pd.DataFrame(columns=['Trans. Date', 'Transaction Type', 'Platform',
+                                                'Transaction To/From', 'Amount']))
+
+    balance = history['latest'][1] if history['latest'] is not None else 0
+    return sections_from_cube(cube, balance), rankings_from_cube(cube)
+
+
+# =========================================================
+# SAVING / LOADING HISTORIES
+# =========================================================
+def history_path(directory, account):
+    safe_name = re.sub(r'[^\w.-]', '_', account) or 'account'
+    return Path(directory) / f"{safe_name}.parquet"
+
+
+def save_history(history, directory):
+    path = history_path(directory, history['account'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_cleaned(history_transactions(history), path)
+
+
+def load_history(account, directory):
+    """
+    The saved history of account, or a new empty one.
+    """
+    history = new_history(account)
+    path = history_path(directory, account)
+    if path.exists():
+        merge_statement(history, load_cleaned(path))
+    return history
@@ -0,0 +1,163 @@
+import contextvars
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnostics import recording
+
+
+# =========================================================
+# BACKGROUND PROCESSING JOBS
+# =========================================================
+# Processing an upload runs as a job on a process-wide thread pool
+# instead of inside the Streamlit script, so reruns (widget
+# changes, a second click, a browser refresh) never interrupt it.
+# Jobs are keyed by the upload's content hash: submitting the same
+# upload again returns the existing job. Each job records its stage
+# spans (see diagnostics.py), which drive its progress against the
+# stages it is expected to run.
+#
+# A job (and the upload it keeps) is only given to the sessions that
+# submitted it: each passes its own token (see submit_job), and
+# get_job/job_data check it. Knowing an upload's key is not enough.
+#
+# STATEMENT_JOB_WORKERS=<n> sets the pool size (default 2). At most
+# MAX_FINISHED_JOBS finished jobs are kept (oldest dropped first).
+JOB_WORKERS = int(os.environ.get('STATEMENT_JOB_WORKERS', '2'))
+MAX_FINISHED_JOBS = 8
+
+# How often a page waiting on a job reruns to check on it
+POLL_SECONDS = 0.5
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='statement-job')
+
+# Work a job runs beside its own stages (see run_beside)
+_side_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='statement-side')
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+# The job whose function is running (see set_job_stages)
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+
+def _run(job, func, args, memory):
+    job['status'] = 'running'
+    job['started'] = time.time()
+    current = _current_job.set(job)
+    try:
+        with recording(job['spans'], memory):
+            func(*args)
+        job['status'] = 'done'
+    except Exception as e:
+        job['error'] = f"{type(e).__name__}: {e}"
+        job['traceback'] = traceback.format_exc()
+        job['status'] = 'failed'
+    finally:
+        _current_job.reset(current)
+        job['finished'] = time.time()
+
+
+def _drop_old_jobs():
+    finished = [key for key, job in _jobs.items() if job['status'] in ('done', 'failed')]
+    for key in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[key]
+
+
+def submit_job(key, func, *args, owner, data=None, stages=(), memory=False):
+    """
+    Runs func(*args) in the background as job key, unless that
+    job is already queued, running or done (a failed job is run
+    again). owner is the submitting session's token; every owner
+    can get the job. data (e.g. the upload bytes) is kept with the
+    job so an owner can pick it up after a browser refresh. stages
+    are the span names the job is expected to record.
+    """
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and job['status'] != 'failed':
+            job['owners'].add(owner)
+            _jobs.move_to_end(key)
+            return job
+
+        job = {
+            'key': key,
+            'status': 'queued',
+            'owners': {owner},
+            'stages': list(stages),
+            'spans': [],
+            'data': data,
+            'error': None,
+            'traceback': None,
+            'submitted': time.time(),
+            'started': None,
+            'finished': None,
+        }
+        _jobs[key] = job
+        _drop_old_jobs()
+
+    _executor.submit(_run, job, func, args, memory)
+    return job
+
+
+def run_beside(func, *args):
+    """
+    Starts func(*args) on another thread and returns its future.
+    Its spans are recorded with the calling job's spans (peak
+    memory of overlapping spans is then only indicative).
+    """
+    return _side_executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def get_job(key, owner):
+    """
+    Job key, or None if there is none or owner did not submit it.
+    """
+    with _lock:
+        job = _jobs.get(key)
+        return job if job is not None and owner in job['owners'] else None
+
+
+def job_data(key, owner):
+    """
+    The data kept with job key, for one of its owners only.
+    """
+    job = get_job(key, owner)
+    return job['data'] if job is not None else None
+
+
+def set_job_stages(stages):
+    """
+    Replaces the stages the running job is expected to record
+    (e.g. once it knows one is skipped). Does nothing outside a job.
+    """
+    job = _current_job.get()
+    if job is not None:
+        job['stages'] = list(stages)
+
+
+def job_progress(job):
+    """
+    (fraction done, last finished stage) of a job, from its
+    expected stages that have finished spans.
+    """
+    if job['status'] == 'done':
+        return 1.0, None
+
+    finished = {record['span'] for record in job['spans']}
+    stages = job['stages']
+    done = sum(stage in finished for stage in stages)
+    last = job['spans'][-1]['span'] if job['spans'] else None
+    return min(done / max(len(stages), 1), 0.99), last
+
+
+def drop_job(key):
+    """
+    Forgets a finished job (and the upload it keeps).
+    """
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and job['status'] in ('done', 'failed'):
+            del _jobs[key]
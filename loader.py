@@ -0,0 +1,107 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+from analysis import SAVINGS_SHEET
+from diagnostics import span
+
+
+# =========================================================
+# STATEMENT WORKBOOK LOADER
+# =========================================================
+# The workbook is opened once and every sheet that is needed is
+# parsed once (header=None); the header row is then located in
+# the parsed rows instead of re-reading with a fixed header=6.
+HEADER_MARKER = 'Trans. Date'
+DEFAULT_HEADER_ROW = 6
+HEADER_SEARCH_ROWS = 30
+
+# Excel reader backends (pandas engine: module it needs), fastest
+# first. "auto" uses the first installed one; set the
+# STATEMENT_EXCEL_READER environment variable (or pass reader=)
+# to force one. Both give the same frames and dtypes.
+READER_BACKENDS = {
+    'calamine': 'python_calamine',
+    'openpyxl': 'openpyxl',
+}
+READER_ENV_VAR = 'STATEMENT_EXCEL_READER'
+
+
+def available_readers():
+    return [
+        name for name, module in READER_BACKENDS.items()
+        if importlib.util.find_spec(module) is not None
+    ]
+
+
+def resolve_reader(reader=None):
+    """
+    Returns the pandas engine name for reader ('auto', a key of
+    READER_BACKENDS, or None to use STATEMENT_EXCEL_READER).
+    """
+    reader = reader or os.environ.get(READER_ENV_VAR, 'auto')
+
+    if reader == 'auto':
+        return available_readers()[0]
+    if reader not in READER_BACKENDS:
+        raise ValueError(
+            f"Unknown Excel reader {reader!r}; use 'auto' or one of {list(READER_BACKENDS)}"
+        )
+    if reader not in available_readers():
+        raise ImportError(
+            f"Excel reader {reader!r} needs the {READER_BACKENDS[reader]!r} package"
+        )
+    return reader
+
+
+def find_header_row(raw):
+    """
+    Index of the first row whose cells contain HEADER_MARKER,
+    or DEFAULT_HEADER_ROW if none of the first rows do.
+    """
+    head = raw.head(HEADER_SEARCH_ROWS).astype(object)
+    is_header = head.apply(lambda col: col.astype(str).str.strip() == HEADER_MARKER).any(axis=1)
+
+    if not is_header.any():
+        return DEFAULT_HEADER_ROW
+    return int(is_header.to_numpy().argmax())
+
+
+def frame_from_rows(raw, header_row=None):
+    """
+    Turns a sheet parsed with header=None into the table below
+    its header row, with the dtypes pd.read_excel would give.
+    """
+    if header_row is None:
+        header_row = find_header_row(raw)
+
+    columns = [
+        str(name).strip() if pd.notna(name) else f"Unnamed: {i}"
+        for i, name in enumerate(raw.iloc[header_row])
+    ]
+
+    frame = raw.iloc[header_row + 1:].reset_index(drop=True)
+    frame.columns = columns
+    return frame.infer_objects()
+
+
+def load_statement(source, reader=None):
+    """
+    Opens a statement workbook (path, buffer or upload) once and
+    returns (transactions, savings). savings is None when the
+    workbook has no 'Savings Account Transactions' sheet.
+    """
+    with span('workbook open') as record, pd.ExcelFile(source, engine=resolve_reader(reader)) as xls:
+        raw = pd.read_excel(xls, sheet_name=0, header=None)
+
+        raw_savings = None
+        if SAVINGS_SHEET in xls.sheet_names:
+            raw_savings = pd.read_excel(xls, sheet_name=SAVINGS_SHEET, header=None)
+        record['rows'] = len(raw)
+
+    with span('header parse', rows=len(raw)):
+        transactions = frame_from_rows(raw)
+        savings = frame_from_rows(raw_savings) if raw_savings is not None else None
+
+    return transactions, savings
@@ -0,0 +1,492 @@
+import hashlib
+import os
+import secrets
+import time
+from io import BytesIO
+from pathlib import Path
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from analysis import ANALYSIS_COLUMNS, analyse, build_savings_report, select_top_n, write_report
+from categories import DESCRIPTION_COLUMNS, categorise, compile_rules, load_rules, rules_version
+from cleaning import clean_transactions, compact_column_names, compact_transactions, expand_transactions
+from dataset_view import build_dataset_index
+from filters import build_filter_index
+from history import (history_sections, history_transactions, load_history, merge_statement, new_history,
+                     save_history)
+from jobs import drop_job, run_beside, set_job_stages, submit_job
+from loader import load_statement
+from reconcile import RECONCILE_COLUMNS, reconcile
+from sessions import deep_size, leave_session, touch_session
+from sqlstore import (count_transactions, open_store, read_transactions, store_analysis, store_matching, store_page,
+                      store_report, store_statement, store_values, upload_stored)
+from storage import STORAGE_FORMATS, load_cleaned, save_cleaned
+
+
+# =========================================================
+# CACHED PIPELINE STAGES
+# =========================================================
+# Every stage is keyed on the SHA-256 of the uploaded bytes, so
+# widget reruns reuse the results instead of reprocessing. The
+# raw bytes are passed as "_data" so Streamlit does not hash them.
+# Each stage keeps at most CACHE_MAX_ENTRIES statements (oldest
+# entries are evicted first).
+CACHE_MAX_ENTRIES = 8
+
+# Optional on-disk store of cleaned tables (Parquet or Feather),
+# shared with later sessions so a known upload is never re-cleaned:
+#   STATEMENT_CLEANED_STORE=<directory>
+#   STATEMENT_CLEANED_FORMAT=parquet|feather (default parquet)
+CLEANED_STORE_DIR = os.environ.get('STATEMENT_CLEANED_STORE')
+CLEANED_STORE_FORMAT = os.environ.get('STATEMENT_CLEANED_FORMAT', 'parquet')
+
+# Per-account histories (see history.py) live in the session;
+# STATEMENT_HISTORY_DIR=<directory> also keeps them on disk. They
+# count towards the session's memory (see SESSION_BUFFERS below).
+HISTORY_DIR = os.environ.get('STATEMENT_HISTORY_DIR')
+
+# STATEMENT_SQLITE_PATH=<file> keeps account histories in a SQLite
+# store instead (see sqlstore.py); summaries are then SQL queries.
+SQLITE_PATH = os.environ.get('STATEMENT_SQLITE_PATH')
+
+# STATEMENT_COMPACT=1 keeps cleaned statements in the compact layout
+# (see cleaning.compact_transactions): categoricals, one datetime64
+# column and integer kobo amounts, for a smaller per-session footprint.
+COMPACT_MODE = os.environ.get('STATEMENT_COMPACT', '').lower() in ('1', 'true', 'yes')
+
+# STATEMENT_DIAGNOSTICS_MEMORY=1 adds peak memory to the stage spans
+# (see diagnostics.py); tracing memory slows processing down a lot.
+DIAGNOSTICS_MEMORY = os.environ.get('STATEMENT_DIAGNOSTICS_MEMORY', '').lower() in ('1', 'true', 'yes')
+DIAGNOSTICS_MAX_SPANS = 200
+
+
+def upload_key(data):
+    """
+    Returns the content hash used as the cache key for an upload.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def stored_path(key):
+    """
+    Path of the upload's cleaned table in the store, or None
+    when the store is not enabled.
+    """
+    if not CLEANED_STORE_DIR:
+        return None
+    return Path(CLEANED_STORE_DIR) / f"{key}{STORAGE_FORMATS[CLEANED_STORE_FORMAT]}"
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Reading statement...")
+def parse_statement(key, _data):
+    """
+    Returns (transactions, savings) parsed from one open of the
+    workbook (see loader.load_statement).
+    """
+    return load_statement(BytesIO(_data))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Cleaning transactions...")
+def clean_statement(key, _data):
+    path = stored_path(key)
+    if path is not None and path.exists():
+        df = load_cleaned(path)
+        return compact_transactions(df) if COMPACT_MODE else df
+
+    transactions, _ = parse_statement(key, _data)
+    df = clean_transactions(transactions, compact=COMPACT_MODE)
+
+    if path is not None:
+        # Write then rename so other sessions never read a partial file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + '.partial')
+        save_cleaned(df, partial, fmt=CLEANED_STORE_FORMAT)
+        partial.replace(path)
+
+    return df
+
+
+def cleaned_columns(key, _data, columns):
+    """
+    Only the given columns of the cleaned table, read straight
+    from the store when it already holds this upload.
+    """
+    path = stored_path(key)
+    if path is not None and path.exists():
+        df = load_cleaned(path, columns=columns)
+        return compact_transactions(df) if COMPACT_MODE else df
+
+    if COMPACT_MODE:
+        columns = compact_column_names(columns)
+    return clean_statement(key, _data)[columns]
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Building analysis...")
+def analyse_statement(key, _data):
+    """
+    Returns (sections, rankings) for the upload; Top N sections
+    are sliced from the rankings with analysis.select_top_n.
+    """
+    return analyse(cleaned_columns(key, _data, ANALYSIS_COLUMNS))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Analysing savings...")
+def analyse_savings(key, _data):
+    """
+    Savings analysis of the upload as {'report', 'error',
+    'seconds'}. report is None when the workbook has no usable
+    savings sheet or the analysis failed (error says why).
+    """
+    _, savings = parse_statement(key, _data)
+    if savings is None:
+        return {'report': None, 'error': None, 'seconds': None}
+
+    start = time.perf_counter()
+    try:
+        report, error = build_savings_report(savings), None
+    except Exception as e:
+        report, error = None, f"{type(e).__name__}: {e}"
+    return {'report': report, 'error': error, 'seconds': round(time.perf_counter() - start, 4)}
+
+
+# =========================================================
+# BALANCE RECONCILIATION (see reconcile.py)
+# =========================================================
+# Checked on every upload; account histories are checked again
+# (in the session) whenever rows were added.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Reconciling balances...")
+def reconcile_statement(key, _data):
+    return reconcile(cleaned_columns(key, _data, RECONCILE_COLUMNS))
+
+
+def history_reconciliation(account, df):
+    checks = st.session_state.setdefault("history_reconciliations", {})
+    if account not in checks or checks[account][0] != len(df):
+        checks[account] = (len(df), reconcile(df))
+    return checks[account][1]
+
+
+# =========================================================
+# ACCOUNT HISTORY MODE
+# =========================================================
+def account_history(account):
+    histories = st.session_state.setdefault("histories", {})
+    if account not in histories:
+        histories[account] = load_history(account, HISTORY_DIR) if HISTORY_DIR else new_history(account)
+    return histories[account]
+
+
+def merge_upload(account, key, _data, top_n):
+    """
+    Merges the cleaned upload into the account's history (only
+    once per upload). Returns (transactions, rows, report, rows
+    added) for the whole history; with the SQLite store the
+    transactions are None (see the stored_* functions below).
+    """
+    if SQLITE_PATH:
+        with open_store(SQLITE_PATH) as conn:
+            added = 0
+            if not upload_stored(conn, account, key):
+                # Histories keep the full cleaned layout
+                added = store_statement(conn, account, expand_transactions(clean_statement(key, _data)), upload=key)
+            rows = count_transactions(conn, account)
+        sections, rankings = stored_analysis(SQLITE_PATH, account, rows)
+        return None, rows, select_top_n(sections, rankings, top_n), added
+
+    # Histories keep the full cleaned layout
+    df = expand_transactions(clean_statement(key, _data))
+    history = account_history(account)
+    added = merge_statement(history, df, upload=key)
+
+    if added and HISTORY_DIR:
+        save_history(history, HISTORY_DIR)
+
+    sections, rankings = history_sections(history)
+    df = history_transactions(history)
+    return df, len(df), select_top_n(sections, rankings, top_n), added
+
+
+# In the SQLite store every summary is a query and the account's rows
+# are never held in memory: the dashboard, filters and Dataset tab
+# query the store directly. Results that do not depend on the widgets
+# are cached per (store, account, stored row count); rows are only
+# added, so the count identifies the account's content for every
+# session.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Summarising stored transactions...")
+def stored_analysis(path, account, rows):
+    with open_store(path) as conn:
+        return store_analysis(conn, account)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Checking balances...")
+def stored_reconciliation(path, account, rows):
+    with open_store(path) as conn:
+        return reconcile(read_transactions(conn, account, RECONCILE_COLUMNS))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Categorising transactions...")
+def stored_categories(path, account, rows, rules_key, _rules):
+    """
+    (totals per day, type and category, their categories) of the
+    stored account, for analysis.category_section.
+    """
+    with open_store(path) as conn:
+        df = read_transactions(conn, account, ['Trans. Date', 'Transaction Type', 'Amount', *DESCRIPTION_COLUMNS])
+    categories = categorise(df, _rules)
+    totals = df.groupby(['Trans. Date', 'Transaction Type', categories], dropna=False, observed=True)['Amount'].sum()
+    totals = totals.reset_index()
+    return totals, totals.pop('Category')
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def stored_values(path, account, rows, column):
+    with open_store(path) as conn:
+        return store_values(conn, account, column)
+
+
+def stored_filtered_report(path, account, start, end, types, top_n):
+    with open_store(path) as conn:
+        return store_report(conn, account, top_n, start, end, types)
+
+
+def stored_matching(path, account, *args):
+    with open_store(path) as conn:
+        return store_matching(conn, account, *args)
+
+
+def stored_page(path, account, *args):
+    with open_store(path) as conn:
+        return store_page(conn, account, *args)
+
+
+# =========================================================
+# DATE-RANGE / TYPE FILTERS
+# =========================================================
+# The filter index (see filters.py) is only read after it is
+# built, so it is cached as a shared resource instead of being
+# copied out of the cache on every widget rerun.
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner="Indexing transactions...")
+def filter_index(key, _df):
+    return build_filter_index(_df)
+
+
+def history_filter_index(account, df):
+    """
+    Filter index of the account's history, kept in the session
+    like the history and rebuilt only when rows were added.
+    """
+    indexes = st.session_state.setdefault("history_filter_indexes", {})
+    if account not in indexes or indexes[account][0] != len(df):
+        indexes[account] = (len(df), build_filter_index(df))
+    return indexes[account][1]
+
+
+# =========================================================
+# DATASET TAB (see dataset_view.py)
+# =========================================================
+# Cached like the filter index: a shared resource per upload, or
+# kept in the session for account histories.
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner="Indexing dataset...")
+def dataset_index(key, _df):
+    return build_dataset_index(_df)
+
+
+def history_dataset_index(account, df):
+    indexes = st.session_state.setdefault("history_dataset_indexes", {})
+    if account not in indexes or indexes[account][0] != len(df):
+        indexes[account] = (len(df), build_dataset_index(df))
+    return indexes[account][1]
+
+
+# =========================================================
+# TRANSACTION CATEGORIES (see categories.py)
+# =========================================================
+# Compiled rules are keyed on the rules file's modification time,
+# so an edited rules file is used from the next rerun on.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def compiled_category_rules(version):
+    return compile_rules(load_rules(version[0]))
+
+
+def category_rules():
+    """
+    (version, compiled rules) of the current rules file. Raises
+    ValueError when the file is not valid.
+    """
+    version = rules_version()
+    return version, compiled_category_rules(version)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner="Categorising transactions...")
+def statement_categories(key, rules_key, _df, _rules):
+    """
+    Category of every transaction of the upload's cleaned _df.
+    """
+    return categorise(_df, _rules)
+
+
+def history_categories(account, rules_key, df, rules):
+    """
+    Categories of the account's history, kept in the session like
+    the history (another session's history of the same account
+    and size can hold other rows) and redone only when rows were
+    added or the rules changed.
+    """
+    categories = st.session_state.setdefault("history_categories", {})
+    if account not in categories or categories[account][0] != (len(df), rules_key):
+        categories[account] = ((len(df), rules_key), categorise(df, rules))
+    return categories[account][1]
+
+
+# =========================================================
+# EXCEL REPORT EXPORT
+# =========================================================
+# The report workbook is only written when a download is asked
+# for (see analysis.write_report). Its bytes stay in the session's
+# own buffers (at most REPORT_BUFFERS reports), so asking for the
+# same report again does not write it again.
+REPORT_BUFFERS = 2
+
+
+def export_report(buffers, export_key, df, report, savings_report):
+    """
+    The report workbook as .xlsx bytes. buffers is the session's
+    dict of written reports; export_key identifies the report
+    (upload, Top N, account, history size and category rules).
+    """
+    workbook = buffers.get(export_key)
+    if workbook is None:
+        buffer = BytesIO()
+        write_report(buffer, df, report, savings_report)
+        workbook = buffers[export_key] = buffer.getvalue()
+        while len(buffers) > REPORT_BUFFERS:
+            buffers.pop(next(iter(buffers)), None)
+    return workbook
+
+
+def export_stored_report(buffers, export_key, path, account, report, savings_report):
+    """
+    export_report of an account in the SQLite store; its rows are
+    only read when the workbook is written.
+    """
+    if export_key in buffers:
+        return buffers[export_key]
+    with open_store(path) as conn:
+        df = read_transactions(conn, account)
+    return export_report(buffers, export_key, df, report, savings_report)
+
+
+# =========================================================
+# PER-SESSION MEMORY BUDGET (see sessions.py)
+# =========================================================
+# Session-state dicts counted as the session's own memory; they are
+# emptied when the session is dropped to stay within the budget.
+# Account histories are among them: with STATEMENT_HISTORY_DIR they
+# are saved after every merge and read back from disk on next use;
+# without it a dropped session's histories are lost and rebuilt from
+# the uploads merged again.
+SESSION_BUFFERS = ['report_buffers', 'histories', 'history_filter_indexes', 'history_dataset_indexes',
+                   'history_reconciliations', 'history_categories']
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+
+def upload_size(key, data):
+    """
+    Approximate memory held by the upload's cached stage results.
+    """
+    return deep_size([data, parse_statement(key, data), clean_statement(key, data), analyse_statement(key, data),
+                      analyse_savings(key, data), reconcile_statement(key, data)])
+
+
+def evict_upload(key):
+    """
+    Drops the upload's cached stage results and finished job.
+    """
+    for stage in (parse_statement, clean_statement, analyse_statement, analyse_savings, reconcile_statement,
+                  filter_index, dataset_index):
+        stage.clear(key, None)
+    statement_categories.clear(key, rules_version(), None, None)
+    drop_job(key)
+
+
+def track_session(key, data):
+    """
+    Records that this session uses the upload and its buffers,
+    evicting least recently used sessions' results when the
+    process is over its memory budget.
+    """
+    buffers = [st.session_state.setdefault(name, {}) for name in SESSION_BUFFERS]
+    for evicted in touch_session(session_id(), key, lambda: upload_size(key, data), buffers):
+        evict_upload(evicted)
+
+
+# =========================================================
+# BACKGROUND PROCESSING (see jobs.py)
+# =========================================================
+# Stages a processing job can go through, for its progress bar
+CLEANING_STAGES = ['date conversion', 'amount parse', 'description parse'] + (['compact layout'] if COMPACT_MODE else [])
+PROCESS_STAGES = ['workbook open', 'header parse', *CLEANING_STAGES, 'pivots', 'reconciliation', 'savings analysis']
+
+
+def upload_stages(key, savings=True):
+    """
+    The PROCESS_STAGES processing the upload runs: no cleaning
+    stages when its cleaned table is stored, and no savings
+    analysis when savings is False (no savings sheet).
+    """
+    path = stored_path(key)
+    skipped = set(CLEANING_STAGES) if path is not None and path.exists() else set()
+    if not savings:
+        skipped.add('savings analysis')
+    return [stage for stage in PROCESS_STAGES if stage not in skipped]
+
+
+def process_upload(key, data):
+    """
+    Runs every cached stage for an upload. Used as a background
+    job; the script then finds the results in the caches. The
+    savings sheet is analysed beside the main-sheet stages once
+    the workbook is parsed.
+    """
+    _, savings_sheet = parse_statement(key, data)
+    if savings_sheet is None:
+        set_job_stages(upload_stages(key, savings=False))
+    savings = run_beside(analyse_savings, key, data)
+    clean_statement(key, data)
+    analyse_statement(key, data)
+    reconcile_statement(key, data)
+    savings.result()
+
+
+def session_token():
+    """
+    This session's job owner token (see jobs.py); put in the page
+    URL so the session's jobs are found again after a refresh.
+    """
+    return st.session_state.setdefault("job_token", secrets.token_urlsafe(16))
+
+
+def start_processing(key, data):
+    """
+    The background job processing the upload (started if needed),
+    owned by this session.
+    """
+    return submit_job(key, process_upload, key, data, owner=session_token(), data=data, stages=upload_stages(key),
+                      memory=DIAGNOSTICS_MEMORY)
+
+
+def clear_caches(key=None):
+    """
+    Drops this session's results: its buffers, and the cached
+    stages and finished jobs of its uploads (and of upload key)
+    that no other session uses.
+    """
+    for evicted in leave_session(session_id(), [key] if key else []):
+        evict_upload(evicted)
+    for name in SESSION_BUFFERS:
+        st.session_state.pop(name, None)
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from analysis import TRANSACTION_TYPES, chronological_order, transaction_timestamps
+from cleaning import naira, parse_amount
+from diagnostics import span
+
+
+# =========================================================
+# BALANCE RECONCILIATION
+# =========================================================
+# In timestamp order, every 'Balance After(₦)' should equal the
+# previous balance plus its credit (or minus its debit). The check
+# works on whole arrays in integer kobo: a cumulative sum of the
+# signed amounts gives every expected balance at once, and rows
+# without a balance are bridged from the last row that has one.
+# Rows after the first that cannot be checked (no usable balance
+# before or on them) are counted as unchecked, and a statement only
+# reconciles when none are.
+# A break is a balance more than TOLERANCE_KOBO off. Breaks on
+# duplicated rows are reported as duplicates; any other break is a
+# suspected missing span (transactions absent between the two rows,
+# worth its difference). Everything is linear in the rows (the
+# statement order is not sorted again when it is already in time
+# order), so it runs on every upload.
+TOLERANCE_KOBO = 1
+
+# Rows listed per table (the counts always cover every row)
+MAX_LISTED = 1000
+
+# Cleaned columns read by the reconciliation
+RECONCILE_COLUMNS = ['Transaction Reference', 'Trans. Date', 'Time', 'Transaction Type', 'Transaction To/From',
+                     'Amount', 'Balance After(₦)']
+
+# Columns of a row that must all match for a content duplicate
+DUPLICATE_FIELDS = ['Time', 'Credit', 'Amount', 'To/From', 'Balance']
+
+
+def _kobo(values):
+    return np.rint(values * 100).astype(np.int64)
+
+
+def _balances(df):
+    """
+    'Balance After(₦)' as float naira; comma-formatted text is
+    parsed like the amounts instead of being dropped.
+    """
+    if 'Balance After(₦)' in df.columns:
+        return parse_amount(df['Balance After(₦)'])
+    return naira(df, 'Balance After(₦)')
+
+
+def _duplicates(df, order, timestamps, credit, amount, balance):
+    """
+    Rows (in time order) repeating an earlier row: the same
+    non-empty Transaction Reference, or the same time, type,
+    amount, party and balance.
+    """
+    fields = pd.DataFrame({
+        'Time': timestamps,
+        'Credit': credit,
+        'Amount': amount,
+        'To/From': df['Transaction To/From'].to_numpy(dtype=object)[order],
+        'Balance': balance,
+    })
+    duplicate = fields.duplicated(subset=DUPLICATE_FIELDS).to_numpy()
+
+    if 'Transaction Reference' in df.columns:
+        references = df['Transaction Reference'].iloc[order].reset_index(drop=True)
+        duplicate = duplicate | (references.duplicated() & references.notna()).to_numpy()
+    return duplicate
+
+
+def reconcile(df, tolerance=TOLERANCE_KOBO):
+    """
+    Checks the running balance of a cleaned frame (either layout)
+    and returns {'rows', 'checked', 'unchecked', 'breaks',
+    'duplicates', 'missing_spans', 'unexplained', 'ok',
+    'break_table', 'duplicate_table'}; unexplained is the naira
+    the suspected missing spans add up to, and ok needs every row
+    after the first checked.
+    """
+    with span('reconciliation', rows=len(df)):
+        return _reconcile(df, tolerance)
+
+
+def _reconcile(df, tolerance):
+    timestamps = transaction_timestamps(df).to_numpy()
+    order = chronological_order(timestamps)
+    timestamps = timestamps[order]
+
+    credit = (df['Transaction Type'] == TRANSACTION_TYPES[0]).to_numpy(dtype=bool)[order]
+    amount = _kobo(naira(df, 'Amount').fillna(0).to_numpy(dtype=float)[order])
+    signed = np.where(credit, amount, -amount)
+
+    balance_naira = _balances(df).to_numpy(dtype=float)[order]
+    known = ~np.isnan(balance_naira)
+    balance = _kobo(np.where(known, balance_naira, 0))
+
+    # Expected balance of each row: the last known balance before it
+    # plus the signed amounts since (one cumulative sum for all rows)
+    running = np.cumsum(signed)
+    positions = np.arange(len(df))
+    last_known = np.maximum.accumulate(np.where(known, positions, -1))
+    previous = np.full(len(df), -1)
+    previous[1:] = last_known[:-1]
+    checked = known & (previous >= 0)
+    base = np.maximum(previous, 0)
+    expected = balance[base] + running - running[base]
+    difference = np.where(checked, balance - expected, 0)
+
+    broken = np.abs(difference) > tolerance
+    duplicate = _duplicates(df, order, timestamps, credit, amount, balance_naira)
+    missing = broken & ~duplicate
+
+    rows = np.flatnonzero(broken)[:MAX_LISTED]
+    break_table = pd.DataFrame({
+        'Previous time': timestamps[base[rows]],
+        'Time': timestamps[rows],
+        'Expected balance': expected[rows] / 100,
+        'Balance After(₦)': balance[rows] / 100,
+        'Difference (₦)': difference[rows] / 100,
+        'Kind': np.where(duplicate[rows], 'duplicate', 'missing transactions'),
+    })
+
+    rows = np.flatnonzero(duplicate)[:MAX_LISTED]
+    duplicate_table = pd.DataFrame({
+        'Time': timestamps[rows],
+        'Transaction Type': np.where(credit[rows], TRANSACTION_TYPES[0], TRANSACTION_TYPES[1]),
+        'Amount': amount[rows] / 100,
+        'Balance After(₦)': np.where(known[rows], balance[rows] / 100, np.nan),
+    })
+    if 'Transaction Reference' in df.columns:
+        duplicate_table.insert(0, 'Transaction Reference', df['Transaction Reference'].to_numpy()[order[rows]])
+
+    unchecked = max(len(df) - 1, 0) - int(checked.sum())
+    return {
+        'rows': len(df),
+        'checked': int(checked.sum()),
+        'unchecked': unchecked,
+        'breaks': int(broken.sum()),
+        'duplicates': int(duplicate.sum()),
+        'missing_spans': int(missing.sum()),
+        'unexplained': round(float(difference[missing].sum()) / 100, 2),
+        'ok': not broken.any() and not duplicate.any() and unchecked == 0,
+        'break_table': break_table,
+        'duplicate_table': duplicate_table,
+    }
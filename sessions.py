@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+# PER-SESSION MEMORY BUDGET
+# =========================================================
+# One Streamlit process serves many sessions. Each session records
+# the uploads whose cached results it reads (shared between the
+# sessions using the same upload) and its own in-memory buffers
+# (e.g. downloadable reports and account histories), with their
+# approximate size. When the total for the process goes over
+# MEMORY_BUDGET_MB, the least recently used sessions are dropped:
+# their buffers are emptied and their uploads' cached results are
+# evicted unless another session still uses them. The current
+# session is never dropped.
+#
+# STATEMENT_MEMORY_BUDGET_MB=<n> sets the budget (default 2048).
+MEMORY_BUDGET_MB = float(os.environ.get('STATEMENT_MEMORY_BUDGET_MB', '2048'))
+
+# Items of a set measured to estimate its size
+SET_SAMPLE = 100
+
+_sessions = OrderedDict()
+_upload_sizes = {}
+_lock = threading.Lock()
+
+# Sizes of frames already measured (a deep measure walks every text
+# value), by id; measured again if the frame is gone or reshaped
+_frame_sizes = {}
+
+
+def _frame_size(df):
+    known = _frame_sizes.get(id(df))
+    if known is not None and known[0]() is df and known[1] == df.shape:
+        return known[2]
+    size = int(df.memory_usage(deep=True).sum())
+    _frame_sizes[id(df)] = (weakref.ref(df, lambda _, key=id(df): _frame_sizes.pop(key, None)), df.shape, size)
+    return size
+
+
+def deep_size(obj):
+    """
+    Approximate bytes held by frames, arrays, bytes and the
+    containers holding them.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return _frame_size(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(deep_size(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(deep_size(value) for value in obj)
+    if isinstance(obj, (set, frozenset)):
+        # e.g. a history's references: sized from a sample of them
+        sample = list(islice(obj, SET_SAMPLE))
+        return sys.getsizeof(obj) + len(obj) * sum(map(sys.getsizeof, sample)) // max(len(sample), 1)
+    return sys.getsizeof(obj)
+
+
+def _session_bytes(session):
+    return sum(deep_size(buffer) for buffer in session['buffers'])
+
+
+def _total_bytes():
+    uploads = set().union(*(session['uploads'] for session in _sessions.values()))
+    return sum(_upload_sizes.get(key, 0) for key in uploads) + sum(
+        session['bytes'] for session in _sessions.values())
+
+
+def touch_session(session_id, key, measure, buffers=()):
+    """
+    Records that session_id uses upload key (measure() gives the
+    size of its cached results, asked once per upload) and holds
+    buffers (dicts it owns). Returns the upload keys no session
+    uses any more after enforcing the budget; their cached results
+    should be evicted.
+    """
+    if key not in _upload_sizes:
+        size = measure()
+        with _lock:
+            _upload_sizes[key] = size
+
+    with _lock:
+        session = _sessions.setdefault(session_id, {'uploads': set(), 'buffers': [], 'bytes': 0, 'last_seen': None})
+        session['uploads'].add(key)
+        session['buffers'] = list(buffers)
+        session['bytes'] = _session_bytes(session)
+        session['last_seen'] = time.time()
+        _sessions.move_to_end(session_id)
+
+        evicted = set()
+        while _total_bytes() > MEMORY_BUDGET_MB * 2 ** 20 and len(_sessions) > 1:
+            _, oldest = _sessions.popitem(last=False)
+            for buffer in oldest['buffers']:
+                buffer.clear()
+            evicted |= oldest['uploads']
+
+        in_use = set().union(*(session['uploads'] for session in _sessions.values()))
+        evicted -= in_use
+        for evicted_key in evicted:
+            _upload_sizes.pop(evicted_key, None)
+        return sorted(evicted)
+
+
+def leave_session(session_id, keys=()):
+    """
+    Forgets session_id (its buffers are emptied). Returns the
+    upload keys it used, or keys also given, that no other session
+    uses; their cached results should be evicted.
+    """
+    with _lock:
+        session = _sessions.pop(session_id, None)
+        leaving = set(keys)
+        if session is not None:
+            for buffer in session['buffers']:
+                buffer.clear()
+            leaving |= session['uploads']
+
+        in_use = set().union(*(session['uploads'] for session in _sessions.values()))
+        leaving -= in_use
+        for key in leaving:
+            _upload_sizes.pop(key, None)
+        return sorted(leaving)
+
+
+def session_usage():
+    """
+    (table of the memory held per session, most recently used
+    first, and the process total in MB). Uploads count in full
+    for every session using them.
+    """
+    with _lock:
+        rows = [
+            {
+                'Session': session_id[:8],
+                'Uploads': len(session['uploads']),
+                'MB': round((sum(_upload_sizes.get(key, 0) for key in session['uploads']) + session['bytes'])
+                            / 2 ** 20, 2),
+                'Last seen': time.strftime('%H:%M:%S', time.localtime(session['last_seen'])),
+            }
+            for session_id, session in reversed(_sessions.items())
+        ]
+        total = round(_total_bytes() / 2 ** 20, 2)
+    return pd.DataFrame(rows, columns=['Session', 'Uploads', 'MB', 'Last seen']), total
@@ -0,0 +1,368 @@
+import re
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from analysis import (DAILY_SECTION, MONTHLY_SECTION, PLATFORM_SECTION, SUMMARY_SECTION, TRANSACTION_TYPES,
+                      add_percentage_columns, convert_distinct, finish_sections, monthly_section, ranking_table,
+                      select_top_n, summary_section)
+from history import row_keys
+
+
+# =========================================================
+# SQLITE TRANSACTION STORE
+# =========================================================
+# Optional embedded store for cleaned transactions of one or more
+# accounts. Every summary is an aggregate query over covering
+# indexes (account + date / type / platform / counterparty, each
+# holding the amount), so long histories are summarised without
+# loading rows into pandas. Missing times are stored as NULL. Rows
+# are only ever added, and each account's row count is kept in the
+# accounts table, so the count identifies what the account holds.
+SQL_COLUMNS = {
+    'Transaction Reference': 'reference',
+    'Trans. Date': 'trans_date',
+    'Time': 'trans_time',
+    'Transaction Type': 'type',
+    'Transaction To/From': 'counterparty',
+    'Transaction Name': 'name',
+    'Account/Phone': 'account_phone',
+    'Platform': 'platform',
+    'Channel': 'channel',
+    'Extra Info': 'extra_info',
+    'Amount': 'amount',
+    'Balance After(₦)': 'balance',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    account TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    trans_date TEXT,
+    trans_time TEXT,
+    type TEXT,
+    counterparty TEXT,
+    name TEXT,
+    account_phone TEXT,
+    platform TEXT,
+    channel TEXT,
+    extra_info TEXT,
+    amount REAL,
+    balance REAL,
+    PRIMARY KEY (account, reference)
+);
+DROP INDEX IF EXISTS idx_transactions_date;
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions (account, trans_date, trans_time, type, amount, balance);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (account, type, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_platform ON transactions (account, platform, type, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_counterparty ON transactions (account, type, counterparty, amount);
+CREATE TABLE IF NOT EXISTS uploads (
+    account TEXT NOT NULL,
+    upload TEXT NOT NULL,
+    PRIMARY KEY (account, upload)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    account TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL
+);
+"""
+
+
+def open_store(path):
+    """
+    Connection to the store at path (created if needed). Use as
+    a context manager: with open_store(path) as conn: ...
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    return closing(conn)
+
+
+def _migrate(conn):
+    """
+    Brings a store written by an older version up to date (its
+    version is kept in PRAGMA user_version).
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        # Missing times were stored as the text 'nan' or 'None'
+        with conn:
+            conn.execute("UPDATE transactions SET trans_time = NULL WHERE trans_time IN ('nan', 'None', 'NaT')")
+            conn.execute("PRAGMA user_version = 1")
+    if version < 2:
+        # Row counts were not kept per account
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO accounts SELECT account, COUNT(*) FROM transactions GROUP BY account")
+            conn.execute("PRAGMA user_version = 2")
+
+
+# =========================================================
+# WRITING
+# =========================================================
+def upload_stored(conn, account, upload):
+    """
+    True when the upload was already stored for the account.
+    """
+    found = conn.execute("SELECT 1 FROM uploads WHERE account = ? AND upload = ?", (account, upload)).fetchone()
+    return found is not None
+
+
+def store_statement(conn, account, df, upload=None):
+    """
+    Inserts the cleaned statement's rows that the account does
+    not have yet (by Transaction Reference). upload marks the
+    statement as stored so it is skipped next time (before any
+    row is converted). Returns the number of rows added.
+    """
+    if upload is not None and upload_stored(conn, account, upload):
+        return 0
+
+    rows = df[list(SQL_COLUMNS)].rename(columns=SQL_COLUMNS)
+    rows['reference'] = row_keys(df)
+    rows['trans_date'] = pd.to_datetime(rows['trans_date']).dt.strftime('%Y-%m-%d')
+    rows['trans_time'] = rows['trans_time'].astype(str).where(rows['trans_time'].notna(), None)
+    rows['amount'] = pd.to_numeric(rows['amount'], errors='coerce')
+    rows.insert(0, 'account', account)
+    rows = rows.astype(object).where(rows.notna(), None)
+
+    with conn:
+        if upload is not None:
+            cursor = conn.execute("INSERT OR IGNORE INTO uploads VALUES (?, ?)", (account, upload))
+            if cursor.rowcount == 0:
+                return 0
+
+        added = conn.executemany(
+            f"INSERT OR IGNORE INTO transactions ({', '.join(rows.columns)}) "
+            f"VALUES ({', '.join('?' * len(rows.columns))})",
+            rows.itertuples(index=False, name=None)
+        ).rowcount
+        conn.execute(
+            "INSERT INTO accounts VALUES (?, ?) ON CONFLICT (account) DO UPDATE SET rows = rows + excluded.rows",
+            (account, added)
+        )
+    return added
+
+
+# =========================================================
+# AGGREGATE QUERIES
+# =========================================================
+# Each query covers the account's transactions or a window of them:
+# start..end (dates, inclusive) and/or the given transaction types.
+def _query(conn, sql, params):
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def _where(account, start=None, end=None, types=None):
+    """
+    WHERE clause and parameters selecting the account's
+    transactions in the window.
+    """
+    clauses, params = ["account = ?"], [account]
+    if start is not None:
+        clauses.append("trans_date BETWEEN ? AND ?")
+        params += [pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')]
+    if types is not None:
+        clauses.append(f"type IN ({', '.join('?' * len(types))})")
+        params += list(types)
+    return " AND ".join(clauses), params
+
+
+def _type_pivot(rows, index):
+    pivot = rows.pivot_table(index=index, columns='type', values='total', aggfunc='sum', fill_value=0)
+    return pivot.reindex(columns=TRANSACTION_TYPES, fill_value=0)
+
+
+def store_sections(conn, account, start=None, end=None, types=None):
+    """
+    The Top-N-independent Analysis sections for the account's
+    window, in the layout of analysis.build_sections. The balance
+    is the one after the window's last transaction of any type.
+    """
+    where, params = _where(account, start, end, types)
+
+    totals = _query(conn, f"""
+        SELECT type, SUM(amount) AS total, COUNT(*) AS count
+        FROM transactions WHERE {where} GROUP BY type
+    """, params).set_index('type').reindex(TRANSACTION_TYPES, fill_value=0)
+
+    balance_where, balance_params = _where(account, start, end)
+    latest = conn.execute(f"""
+        SELECT balance FROM transactions WHERE {balance_where}
+        ORDER BY trans_date DESC, trans_time IS NULL, trans_time DESC LIMIT 1
+    """, balance_params).fetchone()
+
+    # One row per day in index order (no sort); months are rolled up from days
+    type_sums = ', '.join(f'SUM(CASE WHEN type = ? THEN amount ELSE 0 END) AS "{transaction_type}"'
+                          for transaction_type in TRANSACTION_TYPES)
+    daily = _query(conn, f"""
+        SELECT trans_date, {type_sums}
+        FROM transactions WHERE {where} GROUP BY trans_date
+    """, [*TRANSACTION_TYPES, *params]).set_index('trans_date')
+    daily.index = pd.DatetimeIndex(daily.index)
+
+    platform = _query(conn, f"""
+        SELECT platform AS Platform, type, SUM(amount) AS total
+        FROM transactions WHERE {where} AND platform IS NOT NULL GROUP BY platform, type
+    """, params)
+
+    return finish_sections({
+        SUMMARY_SECTION: summary_section(
+            totals.loc['Debit(₦)', 'total'],
+            totals.loc['Credit(₦)', 'total'],
+            totals.loc['Debit(₦)', 'count'],
+            totals.loc['Credit(₦)', 'count'],
+            latest[0] if latest else 0
+        ),
+        MONTHLY_SECTION: monthly_section(daily.groupby(daily.index.to_period('M')).sum()),
+        PLATFORM_SECTION: add_percentage_columns(_type_pivot(platform, 'Platform')),
+        DAILY_SECTION: daily.set_axis(pd.Index(daily.index.date, name='Date_Only')),
+    })
+
+
+def store_rankings(conn, account, start=None, end=None, types=None):
+    """
+    {type: counterparty ranking} for the account's window, as
+    analysis.ranking_table builds them.
+    """
+    where, params = _where(account, start, end, types)
+    totals = _query(conn, f"""
+        SELECT type, counterparty AS "Transaction To/From", SUM(amount) AS total
+        FROM transactions WHERE {where} AND counterparty IS NOT NULL GROUP BY type, counterparty
+    """, params)
+    return {
+        transaction_type: ranking_table(
+            totals.loc[totals['type'] == transaction_type].set_index('Transaction To/From')['total'])
+        for transaction_type in TRANSACTION_TYPES
+    }
+
+
+def store_analysis(conn, account, start=None, end=None, types=None):
+    """
+    (sections, rankings) of the account's window, as
+    analysis.analyse returns them.
+    """
+    return (store_sections(conn, account, start, end, types),
+            store_rankings(conn, account, start, end, types))
+
+
+def store_report(conn, account, top_n=10, start=None, end=None, types=None):
+    """
+    Every Analysis section for the account's window, served from
+    the store.
+    """
+    return select_top_n(*store_analysis(conn, account, start, end, types), top_n)
+
+
+def count_transactions(conn, account):
+    found = conn.execute("SELECT rows FROM accounts WHERE account = ?", (account,)).fetchone()
+    return found[0] if found else 0
+
+
+# =========================================================
+# READING ROWS
+# =========================================================
+def _cleaned_layout(rows):
+    """
+    Queried rows (SQL column names) in the cleaned layout.
+    """
+    rows = rows.rename(columns={sql: column for column, sql in SQL_COLUMNS.items()})
+    if 'Trans. Date' in rows.columns:
+        rows['Trans. Date'] = convert_distinct(rows['Trans. Date'], lambda dates: pd.to_datetime(dates).dt.date)
+    if 'Time' in rows.columns:
+        rows['Time'] = convert_distinct(
+            rows['Time'], lambda times: pd.to_datetime(times, format='%H:%M:%S', errors='coerce').dt.time)
+    return rows
+
+
+def read_transactions(conn, account, columns=None):
+    """
+    The account's transactions in the cleaned layout (only the
+    given cleaned columns, if any), by date.
+    """
+    selected = [SQL_COLUMNS[column] for column in columns or SQL_COLUMNS]
+    rows = _query(conn, f"""
+        SELECT {', '.join(selected)} FROM transactions
+        WHERE account = ? ORDER BY trans_date, trans_time
+    """, (account,))
+    return _cleaned_layout(rows)
+
+
+# Columns held in an index with the type and amount. Reading any
+# other column of most of an account's rows is faster with a plain
+# table scan than by looking up every row through the index.
+INDEXED_COLUMNS = {'type', 'platform'}
+
+
+def store_values(conn, account, column):
+    """
+    Distinct values of a cleaned column for the account, sorted.
+    """
+    sql = SQL_COLUMNS[column]
+    source = "transactions" if sql in INDEXED_COLUMNS else "transactions NOT INDEXED"
+    rows = conn.execute(
+        f"SELECT DISTINCT {sql} FROM {source} WHERE account = ? AND {sql} IS NOT NULL ORDER BY {sql}",
+        (account,)
+    )
+    return [row[0] for row in rows]
+
+
+# Words of a Dataset tab search (see store_page)
+_WORD = re.compile(r'\w+')
+
+
+def _page_where(account, query='', filters=None, amount_range=None):
+    """
+    WHERE clause and parameters selecting the account's rows that
+    match a Dataset tab search, filters and amount range.
+    """
+    where, params = _where(account)
+    for word in _WORD.findall(query.lower()):
+        # LIKE ignores (ASCII) case
+        where += " AND (name LIKE ? ESCAPE '\\' OR counterparty LIKE ? ESCAPE '\\')"
+        params += ['%' + word.replace('_', '\\_') + '%'] * 2
+    for column, keep in (filters or {}).items():
+        where += f" AND {SQL_COLUMNS[column]} IN ({', '.join('?' * len(keep))})"
+        params += list(keep)
+    if amount_range is not None:
+        where += " AND amount BETWEEN ? AND ?"
+        params += list(amount_range)
+    return where, params
+
+
+def store_matching(conn, account, query='', filters=None, amount_range=None):
+    """
+    Number of the account's rows store_page can page through.
+    """
+    words = _WORD.search(query)
+    if not (words or filters or amount_range is not None):
+        return count_transactions(conn, account)
+
+    covered = not words and all(SQL_COLUMNS[column] in INDEXED_COLUMNS for column in filters or {})
+    source = "transactions" if covered else "transactions NOT INDEXED"
+    where, params = _page_where(account, query, filters, amount_range)
+    return conn.execute(f"SELECT COUNT(*) FROM {source} WHERE {where}", params).fetchone()[0]
+
+
+def store_page(conn, account, query='', filters=None, amount_range=None, sort_by=None, descending=False,
+               limit=100, offset=0):
+    """
+    One page of the account's rows (cleaned layout) for the
+    Dataset tab, like dataset_view.matching_rows: every word of
+    query must appear in Transaction Name or To/From, filters is
+    {column: values to keep} and amount_range (min, max) naira,
+    inclusive. Rows are in sort_by order (missing values last),
+    or by date if None.
+    """
+    where, params = _page_where(account, query, filters, amount_range)
+    if sort_by is None:
+        order = "trans_date, trans_time"
+    else:
+        sql = SQL_COLUMNS[sort_by]
+        order = f"{sql} IS NULL, {sql} {'DESC' if descending else 'ASC'}"
+    page = _query(conn, f"""
+        SELECT {', '.join(SQL_COLUMNS.values())} FROM transactions
+        WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?
+    """, [*params, int(limit), int(offset)])
+    return _cleaned_layout(page)
@@ -0,0 +1,83 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+from cleaning import COLS_ORDER, expand_transactions, parse_amount
+
+
+# =========================================================
+# COLUMNAR STORE FOR CLEANED TRANSACTIONS
+# =========================================================
+# Cleaned tables (COLS_ORDER) saved as Parquet or Feather load
+# back without re-cleaning, and a reader can ask for only the
+# columns it needs. Both formats need the optional pyarrow package.
+STORAGE_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+TEXT_COLUMNS = ['Transaction Reference', 'Transaction Type', 'Transaction To/From', 'Transaction Name',
+                'Account/Phone', 'Platform', 'Channel', 'Extra Info']
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("Saving cleaned data as Parquet/Feather needs the 'pyarrow' package")
+
+
+def format_for(path):
+    """
+    Storage format ('parquet' or 'feather') from a file suffix.
+    """
+    suffix = Path(path).suffix.lower()
+    for fmt, fmt_suffix in STORAGE_FORMATS.items():
+        if suffix == fmt_suffix:
+            return fmt
+    raise ValueError(f"Unknown cleaned-data format for {path!r}; use one of {list(STORAGE_FORMATS.values())}")
+
+
+def storable_frame(df):
+    """
+    The cleaned table with one type per column: text columns
+    as strings, amounts as float, Trans. Date and Time as
+    date/time values (stored as Arrow date32/time64). Compact
+    frames are expanded first.
+    """
+    df = expand_transactions(df)[COLS_ORDER].reset_index(drop=True)
+
+    for col in TEXT_COLUMNS:
+        values = df[col]
+        df[col] = values.where(values.isna(), values.astype(str))
+
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    df['Balance After(₦)'] = parse_amount(df['Balance After(₦)'])
+    return df
+
+
+def save_cleaned(df, path, fmt=None):
+    """
+    Writes the cleaned table to path. fmt defaults to the
+    format matching the path suffix (.parquet or .feather).
+    """
+    _require_pyarrow()
+    fmt = fmt or format_for(path)
+    df = storable_frame(df)
+
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+
+def load_cleaned(path, columns=None):
+    """
+    Reads a table written by save_cleaned. columns limits the
+    read to those columns (None reads all of COLS_ORDER).
+    """
+    _require_pyarrow()
+    fmt = format_for(path)
+
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
@@ -0,0 +1,28 @@
+import json
+
+from batch import MANIFEST_NAME, main, report_names
+from benchmarks.generate import generate_transactions, write_workbook
+
+
+def test_same_named_statements_get_separate_reports(tmp_path):
+    inputs = tmp_path / 'statements'
+    for folder, seed in (('a', 0), ('b', 1)):
+        (inputs / folder).mkdir(parents=True)
+        write_workbook(inputs / folder / 'statement.xlsx', generate_transactions(200, seed=seed))
+    output = tmp_path / 'reports'
+
+    assert main([str(inputs / '**' / '*.xlsx'), '--output', str(output), '--workers', '2']) == 0
+
+    manifest = json.loads((output / MANIFEST_NAME).read_text(encoding='utf-8'))
+    reports = [entry['report'] for entry in manifest['files']]
+    assert len(set(reports)) == 2
+    assert sorted(path.name for path in output.glob('*.xlsx')) == ['a__statement_report.xlsx',
+                                                                   'b__statement_report.xlsx']
+    assert all((output / path).exists() for path in reports)
+
+
+def test_clashing_report_names_get_a_hash(tmp_path):
+    paths = [tmp_path / 'a__b.xlsx', tmp_path / 'a' / 'b.xlsx']
+    names = report_names(paths)
+    assert len(set(names.values())) == 2
+    assert all(name.startswith('a__b_') and name.endswith('_report.xlsx') for name in names.values())
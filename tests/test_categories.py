@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from categories import UNCATEGORISED, categorise, compile_rules
+
+
+def _rule(category, keywords):
+    return {'category': category, 'keywords': keywords, 'counterparties': [], 'platforms': [],
+            'min_amount': -np.inf, 'max_amount': np.inf}
+
+
+@pytest.mark.parametrize('rules, expected', [
+    ([_rule('Shopping', ['purchase']), _rule('POS', ['pos purchase'])], ['Shopping', UNCATEGORISED, UNCATEGORISED]),
+    ([_rule('Cash', ['pos']), _rule('POS', ['pos purchase'])], ['Cash', 'Cash', UNCATEGORISED]),
+    ([_rule('POS', ['pos purchase']), _rule('Cash', ['pos'])], ['POS', 'Cash', UNCATEGORISED]),
+])
+def test_earlier_rules_win_over_overlapping_later_phrases(rules, expected):
+    df = pd.DataFrame({'Transaction To/From': ['POS Purchase', 'Pos', 'Purchases'], 'Transaction Name': None,
+                       'Platform': None, 'Extra Info': None, 'Amount': 100.0})
+    assert categorise(df, compile_rules(rules)).astype(str).tolist() == expected
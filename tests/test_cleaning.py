@@ -0,0 +1,50 @@
+import re
+
+import pandas as pd
+import pytest
+
+from benchmarks.generate import _money, generate_transactions, write_workbook
+from cleaning import clean_transactions
+from loader import load_statement
+from reference_cleaning import original_clean
+
+# Intended differences from the original cleaning:
+#   - names are taken after 'from'/'to' as whole words only, so
+#     descriptions holding them just inside other words (e.g.
+#     'Total Energies') get a different Transaction Name;
+#   - Balance After(₦) is parsed to float like the amounts.
+_SUBSTRING = re.compile(r'from|to')
+_WHOLE_WORD = re.compile(r'\bfrom\b|\bto\b')
+
+
+def _parsed(values):
+    return values.replace('--', 0).replace(',', '', regex=True).astype(float)
+
+
+@pytest.fixture(params=[0, 1])
+def raw_statement(request, tmp_path):
+    transactions = generate_transactions(2000, seed=request.param)
+    if request.param:
+        # OPay exports also hold balances as comma-formatted text
+        transactions['Balance After(₦)'] = _money(transactions['Balance After(₦)'])
+    path = tmp_path / 'statement.xlsx'
+    write_workbook(path, transactions)
+    raw, _ = load_statement(path)
+    return raw
+
+
+def test_matches_original_cleaning(raw_statement):
+    result = clean_transactions(raw_statement).astype(object)
+    expected = original_clean(raw_statement)
+    expected['Balance After(₦)'] = _parsed(expected['Balance After(₦)'])
+    expected = expected.astype(object)
+
+    lower = raw_statement['Description'].astype(str).str.lower()
+    renamed = (lower.str.count(_SUBSTRING) != lower.str.count(_WHOLE_WORD)).to_numpy()
+    assert renamed.any() and not renamed.all()
+
+    pd.testing.assert_frame_equal(result.drop(columns='Transaction Name'),
+                                  expected.drop(columns='Transaction Name'), check_dtype=False)
+    pd.testing.assert_series_equal(result['Transaction Name'][~renamed], expected['Transaction Name'][~renamed],
+                                   check_dtype=False)
+
@@ -0,0 +1,52 @@
+import datetime
+
+import pandas as pd
+
+from analysis import SUMMARY_SECTION
+from benchmarks.generate import generate_transactions
+from cleaning import clean_transactions
+from filters import build_filter_index, filtered_report
+from sqlstore import open_store, read_transactions, store_report, store_sections, store_statement
+
+
+def test_missing_times_are_null_and_sort_last(tmp_path):
+    df = clean_transactions(generate_transactions(50, seed=3))
+    on_latest = df[df['Trans. Date'] == df['Trans. Date'].max()]
+    expected = on_latest.loc[on_latest['Time'].idxmax(), 'Balance After(₦)']
+    # An untimed row on the latest day must not count as the latest
+    df.loc[on_latest.index[0], 'Time'] = None
+    df.loc[on_latest.index[0], 'Balance After(₦)'] = -1.0
+
+    with open_store(str(tmp_path / 'store.db')) as conn:
+        store_statement(conn, 'acct', df)
+        times = [row[0] for row in conn.execute("SELECT trans_time FROM transactions")]
+        summary = store_sections(conn, 'acct')[SUMMARY_SECTION].set_index('Metric')
+
+    assert times.count(None) == 1
+    assert not {'nan', 'None', 'NaT'} & set(times)
+    assert summary.loc['Current Balance', 'Value (₦)'] == expected
+
+
+def test_text_missing_times_from_older_stores_become_null(tmp_path):
+    path = str(tmp_path / 'store.db')
+    with open_store(path) as conn:
+        store_statement(conn, 'acct', clean_transactions(generate_transactions(20, seed=4)))
+        with conn:
+            conn.execute("UPDATE transactions SET trans_time = 'nan' WHERE rowid <= 2")
+            conn.execute("PRAGMA user_version = 0")
+
+    with open_store(path) as conn:
+        times = [row[0] for row in conn.execute("SELECT trans_time FROM transactions")]
+    assert times.count(None) == 2 and 'nan' not in times
+
+
+def test_window_report_matches_the_filter_index(tmp_path):
+    start, end = datetime.date(2020, 2, 1), datetime.date(2020, 3, 15)
+    with open_store(str(tmp_path / 'store.db')) as conn:
+        store_statement(conn, 'acct', clean_transactions(generate_transactions(3000, seed=7)))
+        index = build_filter_index(read_transactions(conn, 'acct'))
+        for types in (['Debit(₦)', 'Credit(₦)'], ['Credit(₦)']):
+            expected = filtered_report(index, start, end, types, 5)
+            report = store_report(conn, 'acct', 5, start, end, types)
+            for title, section in expected.items():
+                pd.testing.assert_frame_equal(report[title], section, check_dtype=False)